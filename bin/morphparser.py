@@ -9,6 +9,12 @@
 # -d       print debug info
 # -n num   use an nth order ngram model for selecting best paradigm
 #          (an n-gram model for variables in the paradigm is used)
+# -w num   analyze with num worker processes (default: one per CPU)
+# -b num   send num lines at a time to the workers (default: 64)
+# -s path  build the model once and serve analyses on the Unix socket path
+#          instead of reading STDIN
+# -o file  compile the model to file and exit. A compiled model can be given
+#          instead of the paradigm file and loads much faster.
 
 # Example:
 # echo "coger cojo" | python morphparser.py ./../paradigms/spanish_verbs.p -k 1 -t
@@ -26,16 +32,14 @@
 import getopt
 import json
 import sys
-from typing import dict, list, set, tuple
 
-from paradigmextract import morphparser, paradigm
+from paradigmextract import modelfile, morphparser, morphserver, paradigm
 
 
 def build(
     inpfile: str,
     ngramorder: int,
     ngramprior: float,
-    small: bool = False,
     lexicon: str = "",
     inpformat: str = "pfile",
     pos: str = "",
@@ -46,7 +50,7 @@ def build(
     set[str],
 ]:
     if inpformat == "pfile":
-        paradigms = paradigm.load_p_file(inpfile, lex=lexicon)
+        paradigms = paradigm.load_p_file(inpfile, pos=pos)
     elif inpformat == "jsonfile":
         paradigms = paradigm.load_json_file(inpfile, lex=lexicon, pos=pos)
     elif inpformat == "json":
@@ -56,12 +60,25 @@ def build(
 
     # lexicon is removed from build in morphparser
 
-    return morphparser.build(paradigms, ngramorder, ngramprior, small=small)
+    return morphparser.build(paradigms, ngramorder, ngramprior)
 
 
 def main(argv):
     options, remainder = getopt.gnu_getopt(
-        argv[1:], "tk:n:p:dr:c", ["tables", "kbest", "ngram", "prior", "debug", "pprior"]
+        argv[1:],
+        "tk:n:p:dr:cw:b:s:o:",
+        [
+            "tables",
+            "kbest=",
+            "ngram=",
+            "prior=",
+            "debug",
+            "pprior=",
+            "workers=",
+            "batch=",
+            "socket=",
+            "output=",
+        ],
     )
 
     print_tables = False
@@ -70,6 +87,10 @@ def main(argv):
     ngramprior = 0.01
     debug = False
     pprior = 1.0
+    workers = None
+    batch_size = 64
+    socket_path = ""
+    output = ""
     for opt, arg in options:
         if opt in ("-t", "--tables"):
             print_tables = True
@@ -79,51 +100,43 @@ def main(argv):
             ngramorder = int(arg)
         elif opt in ("-p", "--prior"):
             ngramprior = float(arg)
-        elif opt in ("-d", "--debug") or opt in ("-d", "--debug"):
+        elif opt in ("-d", "--debug"):
             debug = True
         elif opt in ("-r", "--pprior"):
             pprior = float(arg)
-    inp = iter(lambda: sys.stdin.readline().decode("utf-8"), "")
-    paras, numexamples, lms, alphabet = build(sys.argv[1], ngramorder, ngramprior)
-    res = []
-    for line in inp:
-        res.append(morphparser.test_paradigms(line, paras, numexamples, lms, pprior))
-
-    for words, analyses in res:
-        # Print all analyses + optionally a table
-        for aindex, (score, p, v) in enumerate(analyses):
-            if aindex >= kbest:
-                break
-            varstring = (
-                "("
-                + ",".join([str(feat) + "=" + val for feat, val in zip(range(1, len(v) + 1), v)])
-                + ")"
-            )
-            table = p(*v)  # Instantiate table with vars from analysis
-            baseform = table[0][0]
-            matchtable = [(form, msd) for form, msd in table if form in words]
-            wordformlist = [
-                form + ":" + baseform + "," + ",".join([m[0] + "=" + m[1] for m in msd])
-                for form, msd in matchtable
-            ]
-            print(
-                (
-                    str(score) + " " + p.name + " " + varstring + " " + "#".join(wordformlist)
-                ).encode("utf-8")
-            )
-            if print_tables:
-                for form, msd in table:
-                    if form in words:
-                        form = "*" + form + "*"
-                    msdprint = ",".join([m[0] + "=" + m[1] for m in msd])
-                    print((form + "\t" + msdprint).encode("utf-8"))
-
-            if debug:
-                print(
-                    "Members:",
-                    ", ".join([p(*[var[1] for var in vs])[0][0] for vs in p.var_insts]),
-                )
-    print()
+        elif opt in ("-w", "--workers"):
+            workers = int(arg)
+        elif opt in ("-b", "--batch"):
+            batch_size = int(arg)
+        elif opt in ("-s", "--socket"):
+            socket_path = arg
+        elif opt in ("-o", "--output"):
+            output = arg
+    if modelfile.is_model_file(remainder[0]):
+        paras, numexamples, lms, alphabet, index = modelfile.load_model(remainder[0])
+    else:
+        paras, numexamples, lms, alphabet = build(remainder[0], ngramorder, ngramprior)
+        index = morphparser.build_index(paras)
+    if output:
+        modelfile.write_model(output, paras, numexamples, lms, alphabet, index=index)
+        return
+    model = morphserver.Model(
+        paras,
+        numexamples,
+        lms,
+        index=index,
+        pprior=pprior,
+        kbest=kbest,
+        print_tables=print_tables,
+        debug=debug,
+    )
+    with morphserver.AnalysisPool(model, workers=workers, batch_size=batch_size) as pool:
+        if socket_path:
+            with morphserver.UnixSocketServer(socket_path, pool) as server:
+                server.serve_forever()
+        else:
+            for result in pool.analyze(sys.stdin):
+                sys.stdout.write(result)
 
 
 if __name__ == "__main__":
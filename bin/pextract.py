@@ -1,5 +1,7 @@
+import getopt
+import logging
 import sys
-from typing import list, tuple
+from collections.abc import Iterable, Iterator
 
 from paradigmextract import pextract
 
@@ -24,16 +26,14 @@ def split_tags(tags: list) -> list[list[tuple[str, str]]]:
     return newforms
 
 
-if __name__ == "__main__":
-    lines = [l.strip() for l in sys.stdin]
-    tables: list[tuple[list[str], list[list[tuple[str, str]]]]] = []
+def read_tables(lines: Iterable[str]) -> Iterator[tuple[list[str], list[list[tuple[str, str]]]]]:
     thistable: list[str] = []
     thesetags: list[str] = []
     for l in lines:
+        l = l.strip()
         if l == "":
             if thistable:
-                splittags = split_tags(thesetags)
-                tables.append((thistable, splittags))
+                yield thistable, split_tags(thesetags)
                 thistable = []
                 thesetags = []
         else:
@@ -46,10 +46,50 @@ if __name__ == "__main__":
             thesetags.append(tag)
 
     if thistable:
-        splittags = split_tags(thesetags)
-        tables.append((thistable, splittags))
+        yield thistable, split_tags(thesetags)
+
+
+# Options:
+# -p fast|exhaustive  learning profile (default: the default LearnerConfig)
+# -j num              learn tables in num worker processes
+# -s                  log statistics for the learned tables to stderr
+
+
+def parse_options(argv: list[str]) -> tuple[pextract.LearnerConfig, int]:
+    options, _ = getopt.gnu_getopt(argv[1:], "p:j:s", ["profile=", "jobs=", "stats"])
+    kwargs = {}
+    profile = None
+    workers = 1
+    for opt, arg in options:
+        if opt in ("-p", "--profile"):
+            profile = arg
+        elif opt in ("-j", "--jobs"):
+            workers = int(arg)
+        elif opt in ("-s", "--stats"):
+            kwargs["collect_stats"] = True
+    if profile == "fast":
+        config = pextract.LearnerConfig.fast(**kwargs)
+    elif profile == "exhaustive":
+        config = pextract.LearnerConfig.exhaustive(**kwargs)
+    else:
+        config = pextract.LearnerConfig(**kwargs)
+    return config, workers
 
-    learnedparadigms = pextract.learnparadigms(tables)
+
+def main(argv):
+    config, workers = parse_options(argv)
+    if config.collect_stats:
+        logging.basicConfig(level=logging.INFO)
+
+    learner = pextract.ParadigmLearner(config=config)
+    learner.add_tables(read_tables(sys.stdin), workers=workers)
+    if config.collect_stats:
+        pextract.log_stats(learner.stats)
+    learnedparadigms = learner.paradigms()
     for p in learnedparadigms:
         # print(str(p) + '\n\n')
         print("a paradigm")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,119 @@
+"""Latency of morphserver.AsyncAnalyzer under concurrent load.
+
+Learns paradigms from the tables, then runs CLIENTS concurrent clients that
+each send requests one after the other, and reports the throughput and the
+latency percentiles for a few batch sizes.
+
+Usage: python examples/async_benchmark.py [tests/testdata.json [WORKERS]]
+"""
+
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from paradigmextract import morphparser, morphserver, pextract
+
+REQUESTS = 4000
+CLIENTS = (1, 16, 128)
+MAX_BATCH = (1, 16, 64)
+
+
+def load_tables(path):
+    if Path(path).exists():
+        with open(path) as fp:
+            return [
+                (table["wordforms"], [[("msd", msd)] for msd in table["msds"]])
+                for table in json.load(fp)
+            ]
+    print(f"{path} not found, using generated tables")
+    stems = [
+        "stad",
+        "bad",
+        "flick",
+        "katt",
+        "gytter",
+        "svält",
+        "ananas",
+        "kackla",
+        "bil",
+        "hund",
+    ]
+    tables = [
+        (
+            [stem + s for s in ("", "s", "en", "ens", "ar", "ars", "arna", "arnas")],
+            [
+                [("msd", msd)]
+                for msd in (
+                    "sg",
+                    "sg gen",
+                    "def",
+                    "def gen",
+                    "pl",
+                    "pl gen",
+                    "pl def",
+                    "pl def gen",
+                )
+            ],
+        )
+        for stem in stems
+    ]
+    tables += [
+        (
+            [stem + s for s in ("a", "an", "or", "orna")],
+            [[("msd", msd)] for msd in ("sg", "def", "pl", "pl def")],
+        )
+        for stem in ("flick", "gat", "kak", "pojk", "lamp")
+    ]
+    return tables
+
+
+async def client(analyzer, words, latencies):
+    for w in words:
+        start = time.perf_counter()
+        await analyzer.analyze([w])
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(model, words, clients, max_batch, workers):
+    latencies = []
+    per_client = [words[i::clients] for i in range(clients)]
+    async with morphserver.AsyncAnalyzer(
+        model, workers=workers, max_batch=max_batch
+    ) as analyzer:
+        await analyzer.analyze([words[0]])  # start the workers
+        start = time.perf_counter()
+        await asyncio.gather(*(client(analyzer, ws, latencies) for ws in per_client))
+        secs = time.perf_counter() - start
+    return secs, latencies
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "tests/testdata.json"
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    tables = load_tables(path)
+    paradigms = pextract.learnparadigms(tables)
+    for i, p in enumerate(paradigms):
+        p.uuid = str(i)
+    paradigms, numexamples, lms, _ = morphparser.build(paradigms, 3, 0.01)
+    model = morphserver.Model(paradigms, numexamples, lms)
+
+    rnd = random.Random(0)
+    words = [w for forms, _ in tables for w in forms]
+    words = [rnd.choice(words) + rnd.choice(("", "", "s", "e")) for _ in range(REQUESTS)]
+    for clients in CLIENTS:
+        for max_batch in MAX_BATCH:
+            secs, latencies = asyncio.run(run(model, words, clients, max_batch, workers))
+            p50, p90, p99 = (statistics.quantiles(latencies, n=100)[i] for i in (49, 89, 98))
+            print(
+                f"clients={clients:4} max_batch={max_batch:3} "
+                f"{len(words) / secs:8.0f} req/s  "
+                f"p50={1000 * p50:7.2f}ms p90={1000 * p90:7.2f}ms p99={1000 * p99:7.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
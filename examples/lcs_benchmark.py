@@ -0,0 +1,47 @@
+"""Compare longest_common_subsequences with the WordGraph intersection.
+
+Usage: python examples/lcs_benchmark.py [tests/testdata.json]
+"""
+
+import functools
+import json
+import operator
+import sys
+import timeit
+from pathlib import Path
+
+from paradigmextract.pextract import WordGraph, longest_common_subsequences
+
+
+def wordgraph_lcs(table):
+    wg = [WordGraph.from_string(x) for x in table]
+    return functools.reduce(operator.and_, wg).longestwords
+
+
+def load_tables(path):
+    if Path(path).exists():
+        with open(path) as fp:
+            return [table["wordforms"] for table in json.load(fp)]
+    print(f"{path} not found, using generated tables")
+    stems = ["stad", "bad", "flick", "katt", "gytter", "svält", "ananas", "kackla"]
+    suffixes = ["", "s", "en", "ens", "er", "ers", "erna", "ernas"]
+    return [
+        [stem + s for s in suffixes] + ["bort" + stem + s for s in suffixes] for stem in stems
+    ]
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "tests/testdata.json"
+    tables = load_tables(path)
+    for table in tables:
+        assert sorted(wordgraph_lcs(table)) == longest_common_subsequences(table)
+
+    for name, func in (("WordGraph", wordgraph_lcs), ("lcs", longest_common_subsequences)):
+        secs = min(timeit.repeat(lambda: [func(t) for t in tables], number=1, repeat=3))
+        print(
+            f"{name:10} {len(tables)} tables {secs:.3f}s ({1000 * secs / len(tables):.3f} ms/table)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -109,39 +109,8 @@ def pr(i, b):
     return "[v] %d" % i if b else "[s] %d" % i
 
 
-def load_p_file(file: str, pos: str = "", lex: str = "") -> list[paradigm.Paradigm]:
-    paradigms = []
-    line_no = 1
-    with codecs.open(file, encoding="utf-8") as f:
-        try:
-            for l in f:
-                try:
-                    (p, ex) = l.strip().split("\t")
-                except Exception:
-                    p = l.strip()
-                    ex = ""
-                p_members = []
-                wfs = []
-                for s in p.split("#"):
-                    (w, m) = s.split("::")
-                    msd = [tuple(x.split("=")) for x in m.split(",,")]
-                    wfs.append((w, msd))
-                if ex != "":
-                    for s in ex.split("#"):
-                        mem = [tuple(vbind.split("=")) for vbind in s.split(",,")]
-                        p_members.append(mem)
-                else:  # no variables
-                    p_members = []
-                paradigms.append((len(p_members), wfs, p_members))
-                line_no += 1
-        except:
-            print(f"Error on line {line_no}")
-            raise
-    paradigms.sort(reverse=True)
-    return [
-        paradigm.Paradigm(wfs, p_members, "p%d_%s" % (i, p_members[0][0][1]), pos=pos, lex=lex)
-        for (i, (_, wfs, p_members)) in enumerate(paradigms, 1)
-    ]
+def load_p_file(file: str, pos: str = "") -> list[paradigm.Paradigm]:
+    return paradigm.load_p_file(file, pos=pos)
 
 
 def main():
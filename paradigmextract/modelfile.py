@@ -0,0 +1,264 @@
+"""Compiled morphparser models.
+
+`write_model` stores what `morphparser.build` computes (the paradigms with
+their variable regexes, the n-gram counts of every variable slot and the
+alphabet) together with the candidate index in one file. `load_model`
+memory-maps the file: the paradigms are created without compiling any
+Genregex, and the n-gram counts of a slot are only read from the file when
+the slot is first evaluated. The counts are then decoded into a dict of the
+loading process, so each process pays for the slots it evaluates; only the
+file itself is shared, through the page cache.
+
+The file starts with the magic bytes, the length of a JSON header and the
+header, followed by the n-gram tables. The keys of a table are stored as
+fixed-width, NUL-padded UTF-32-LE strings and the counts as 32-bit integers.
+
+Example usage:
+    paradigms, numexamples, lms, alphabet = morphparser.build(paradigms, 3, 0.01)
+    modelfile.write_model("model.bin", paradigms, numexamples, lms, alphabet)
+    paradigms, numexamples, lms, alphabet, index = modelfile.load_model("model.bin")
+"""
+
+import array
+import json
+import mmap
+import re
+import struct
+import sys
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from paradigmextract import morphparser, paradigm
+
+MAGIC = b"PXMODEL1"
+_PREAMBLE = struct.Struct("<8sQ")
+_ALIGN = 8
+
+ModelTuple = tuple[
+    list[paradigm.Paradigm],
+    int,
+    dict[str, tuple[float, list[morphparser.StringNgram]]],
+    set[str],
+    morphparser.ParadigmIndex,
+]
+
+
+def is_model_file(path: str) -> bool:
+    """Return True if path is a compiled model file."""
+    with Path(path).open("rb") as fp:
+        return fp.read(len(MAGIC)) == MAGIC
+
+
+def write_model(
+    path: str,
+    paradigms: list[paradigm.Paradigm],
+    numexamples: int,
+    lms: dict[str, tuple[float, list[morphparser.StringNgram]]],
+    alphabet: set[str],
+    index: Optional[morphparser.ParadigmIndex] = None,
+) -> None:
+    """Write a model built by `morphparser.build` to path."""
+    if index is None:
+        index = morphparser.build_index(paradigms)
+    data = bytearray()
+
+    def add_blob(blob: bytes) -> int:
+        offset = len(data)
+        data.extend(blob)
+        data.extend(b"\0" * (-len(data) % _ALIGN))
+        return offset
+
+    lms_header = []
+    # models that are shared between slots are only written once
+    slots_by_model: dict[int, dict[str, Any]] = {}
+    for uuid, (numvars, models) in lms.items():
+        slots = []
+        for model in models:
+            if id(model) not in slots_by_model:
+                slots_by_model[id(model)] = _write_ngram(model, alphabet, add_blob)
+            slots.append(slots_by_model[id(model)])
+        lms_header.append([uuid, numvars, slots])
+
+    header = {
+        "numexamples": numexamples,
+        "alphabet": "".join(sorted(alphabet)),
+        "paradigms": [
+            {
+                "p_id": p.p_id,
+                "pos": p.pos,
+                "uuid": p.uuid,
+                "forms": [["+".join(f.form), f.msd] for f in p.forms],
+                "var_insts": p.var_insts,
+                "v_regex": [r.pattern for r in p.v_regex],
+            }
+            for p in paradigms
+        ],
+        "lms": lms_header,
+        "index": {
+            "anchors": [
+                [head, tail, entries] for (head, tail), entries in index.anchors.items()
+            ],
+            "exact": list(index.exact.items()),
+            "msds": [[msd, entries] for msd, entries in index.msds.items()],
+        },
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    header_bytes += b" " * (-(_PREAMBLE.size + len(header_bytes)) % _ALIGN)
+    with Path(path).open("wb") as fp:
+        fp.write(_PREAMBLE.pack(MAGIC, len(header_bytes)))
+        fp.write(header_bytes)
+        fp.write(data)
+
+
+def _write_ngram(
+    model: morphparser.StringNgram, alphabet: set[str], add_blob: Callable[[bytes], int]
+) -> dict[str, Any]:
+    width = max(map(len, model.ngramcounts), default=0)
+    keys = "".join(key.ljust(width, "\0") for key in model.ngramcounts)
+    counts = array.array("i", model.ngramcounts.values())
+    if sys.byteorder != "little":
+        counts.byteswap()
+    return {
+        "order": model.order,
+        "prior": model.ngramprior,
+        "alphabet": "".join(sorted(model.alphabet - alphabet)),
+        "n": len(counts),
+        "width": width,
+        "keys": add_blob(keys.encode("utf-32-le")),
+        "counts": add_blob(counts.tobytes()),
+    }
+
+
+def load_model(path: str) -> ModelTuple:
+    """Load a model written by `write_model`.
+
+    Returns:
+        paradigms, numexamples, lms and alphabet as returned by
+        `morphparser.build`, and the candidate index.
+    """
+    with Path(path).open("rb") as fp:
+        buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, header_len = _PREAMBLE.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a compiled model file")
+    data_start = _PREAMBLE.size + header_len
+    header = json.loads(buf[_PREAMBLE.size : data_start].decode("utf-8"))
+    data = memoryview(buf)[data_start:]
+
+    alphabet = set(header["alphabet"])
+    paradigms = [
+        paradigm.Paradigm(
+            [(form, _msd(msd)) for form, msd in p["forms"]],
+            [[tuple(var) for var in vs] for vs in p["var_insts"]],
+            p_id=p["p_id"],
+            pos=p["pos"],
+            uuid=p["uuid"],
+            lazy=True,
+            v_regex=LazyRegexes(p["v_regex"]),
+        )
+        for p in header["paradigms"]
+    ]
+    # Slots that share a table share the model, and models share alphabets
+    models: dict[int, MappedNgram] = {}
+    alphabets: dict[str, frozenset[str]] = {}
+    lms: dict[str, tuple[float, list[morphparser.StringNgram]]] = {}
+    for uuid, numvars, slots in header["lms"]:
+        for slot in slots:
+            if slot["keys"] not in models:
+                if slot["alphabet"] not in alphabets:
+                    alphabets[slot["alphabet"]] = frozenset(alphabet | set(slot["alphabet"]))
+                models[slot["keys"]] = MappedNgram(data, slot, alphabets[slot["alphabet"]])
+        lms[uuid] = (numvars, [models[slot["keys"]] for slot in slots])
+    anchors = header["index"]["anchors"]
+    index = morphparser.ParadigmIndex.from_entries(
+        {(head, tail): [tuple(entry) for entry in entries] for head, tail, entries in anchors},
+        {word: [tuple(e) for e in entries] for word, entries in header["index"]["exact"]},
+    )
+    if "msds" in header["index"]:
+        index.msds = {
+            paradigm.msd_key(msd): [tuple(e) for e in entries]
+            for msd, entries in header["index"]["msds"]
+        }
+    else:
+        # written before the msd index was added
+        for pi, p in enumerate(paradigms):
+            for key, indices in p.msd_forms.items():
+                index.msds.setdefault(key, []).extend((pi, fi) for fi in indices)
+    return paradigms, header["numexamples"], lms, alphabet, index
+
+
+def _msd(msd: Union[str, list]) -> Any:
+    if isinstance(msd, list):
+        return [tuple(m) if isinstance(m, list) else m for m in msd]
+    return msd
+
+
+class LazyRegexes(Sequence):
+    """A list of regexes that are compiled from their patterns on first use."""
+
+    def __init__(self, patterns: list[str]) -> None:  # noqa: D107
+        self.patterns = patterns
+
+    def __getattr__(self, attr):  # noqa: ANN204, ANN001
+        """Compile the regexes on first use."""
+        if attr != "regexes":
+            raise AttributeError(f"{self.__class__!r} object has no attribute {attr!r}")
+        self.regexes = [re.compile(pattern) for pattern in self.patterns]
+        return self.regexes
+
+    def __getitem__(self, i):  # noqa: ANN204, ANN001, D105
+        return self.regexes[i]
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self.patterns)
+
+
+class MappedNgram(morphparser.StringNgram):
+    """A `StringNgram` whose counts are read from a model file on first use.
+
+    The counts are decoded into the dict of a `StringNgram`, which is private
+    to the process, not looked up in the mapped file.
+
+    Args:
+       data:memoryview
+            The data section of the model file.
+       slot:dict
+            The description of the table in the header of the model file.
+       alphabet:frozenset(str)
+            The alphabet of the model, which may be shared with other models.
+    """
+
+    def __init__(  # noqa: D107
+        self, data: memoryview, slot: dict[str, Any], alphabet: frozenset[str]
+    ) -> None:
+        self._data = data
+        self._slot = slot
+        self._alphabet = alphabet
+        self.order = slot["order"]
+        self.ngramprior = slot["prior"]
+
+    def __getattr__(self, attr):  # noqa: ANN204, ANN001
+        """Read the counts on first use."""
+        if attr not in _MAPPED_ATTRS:
+            return super().__getattr__(attr)
+        slot = self._slot
+        n, width = slot["n"], slot["width"]
+        keys = bytes(self._data[slot["keys"] : slot["keys"] + 4 * n * width]).decode("utf-32-le")
+        counts = array.array("i")
+        counts.frombytes(self._data[slot["counts"] : slot["counts"] + 4 * n])
+        if sys.byteorder != "little":
+            counts.byteswap()
+        self.alphabet = self._alphabet
+        self._code_alphabet()
+        self._set_counts(
+            {
+                keys[i : i + width].rstrip("\0"): count
+                for i, count in zip(range(0, n * width, width), counts)
+            }
+        )
+        return self.__dict__[attr]
+
+
+# The attributes of a StringNgram that are set from the counts in the file
+_MAPPED_ATTRS = {"alphabet", "counts", "_symbols", "_codes", "_base", "_mod", "_start"}
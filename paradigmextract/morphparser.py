@@ -1,50 +1,220 @@
 """Morph parser."""
 
-import functools
+import heapq
+import itertools
+import logging
 import math
 import operator
-from collections.abc import Iterable, Sequence
+import sys
+from collections.abc import Iterable, Iterator, MutableMapping, Sequence, Set
 from typing import Any, Optional, Union
 
 from paradigmextract import paradigm
 
+logger = logging.getLogger(__name__)
+
+# The match cache that is used when no cache is given. Replace it to change
+# its size, e.g. ``morphparser.match_cache = paradigm.MatchCache(10**6)``.
+match_cache = paradigm.MatchCache()
+
+
+class StringNgram:
+    """A character n-gram model of a set of strings.
+
+    The characters of the alphabet are coded as the integers 1..len(alphabet),
+    and other characters as 0. An n-gram is coded as the number that has the
+    codes of its characters as digits in base len(alphabet) + 1, so the counts
+    and the log-probabilities are kept in dicts with int keys, and the n-grams
+    of a string are found with a rolling sum instead of building substrings.
+    Since the first digit of a counted n-gram is never 0, n-grams and n-1 grams
+    never get the same number.
+    """
 
-class StringNgram:  # noqa: D101
     def __init__(
         self,
-        stringset: list[str],
-        alphabet: Optional[set[str]] = None,
+        stringset: Iterable[str],
+        alphabet: Optional[Set[str]] = None,
         order: int = 2,
         ngramprior: float = 0.01,
     ) -> None:
         """Read a set of strings and create an n-gram model."""
-        self.stringset = ["#" * (order - 1) + s + "#" for s in stringset]
-        self.alphabet = {char for s in self.stringset for char in s}
+        padded = ["#" * (order - 1) + s + "#" for s in stringset]
+        chars = {char for s in padded for char in s}
         self.order = order
         self.ngramprior = ngramprior
-        if alphabet:
-            self.alphabet |= alphabet
-        ngrams = [x for word in self.stringset for x in self._letter_ngrams(word, order)]
-        self.ngramcounts: dict = {}
+        if alphabet and chars <= alphabet:
+            # share the alphabet, and its coding, with the other models
+            self.alphabet = frozenset(alphabet)
+        elif alphabet:
+            self.alphabet = frozenset(chars | alphabet)
+        else:
+            self.alphabet = frozenset(chars)
+        self._code_alphabet()
         # Collect counts for n-grams and n-1 grams (mgrams)
-        for ngram in ngrams:
-            self.ngramcounts[ngram] = self.ngramcounts.get(ngram, 0) + 1
-        mgrams = [x for word in self.stringset for x in self._letter_ngrams(word, order - 1)]
-        for mgram in mgrams:
-            self.ngramcounts[mgram] = self.ngramcounts.get(mgram, 0) + 1
+        self.counts: dict[int, int] = {}
+        for word in padded:
+            codes = [self._codes[char] for char in word]
+            for n in (order, order - 1):
+                for key in self._keys(codes, n):
+                    self.counts[key] = self.counts.get(key, 0) + 1
+
+    @classmethod
+    def from_counts(
+        cls,
+        ngramcounts: dict[str, int],
+        alphabet: Set[str],
+        order: int = 2,
+        ngramprior: float = 0.01,
+    ) -> "StringNgram":
+        """Create a model from already collected n-gram and n-1 gram counts."""
+        model = cls.__new__(cls)
+        model.alphabet = frozenset(alphabet)
+        model.order = order
+        model.ngramprior = ngramprior
+        model._code_alphabet()
+        model._set_counts(ngramcounts)
+        return model
+
+    def _code_alphabet(self) -> None:
+        coding = _alphabet_coding.get(self.alphabet)
+        if coding is None:
+            symbols = sorted(self.alphabet)
+            codes = {char: code for code, char in enumerate(symbols, start=1)}
+            coding = (symbols, codes)
+            _alphabet_coding.clear()
+            _alphabet_coding[self.alphabet] = coding
+        self._symbols, self._codes = coding
+        self._base = len(self._symbols) + 1
+        self._mod = self._base**self.order
+        # the code of the padding at the start of every string
+        self._start = 0
+        for _ in range(self.order - 1):
+            self._start = self._start * self._base + self._codes.get("#", 0)
+
+    def _set_counts(self, ngramcounts: dict[str, int]) -> None:
+        self.counts = {}
+        for ngram, count in ngramcounts.items():
+            key = 0
+            for char in ngram:
+                key = key * self._base + self._codes[char]
+            self.counts[key] = count
+
+    def _keys(self, codes: list[int], n: int) -> list[int]:
+        if n == 0:
+            return []
+        keys = []
+        key = 0
+        mod = self._base**n
+        for i, code in enumerate(codes):
+            key = (key * self._base + code) % mod
+            if i >= n - 1:
+                keys.append(key)
+        return keys
+
+    def __getattr__(self, attr: str) -> dict:
+        """Compute the log-probabilities, or the counts by n-gram string, on first use."""
+        if attr in {"logprobs", "unseen_logprobs"}:
+            self._compute_logprobs()
+        elif attr == "ngramcounts":
+            self.ngramcounts = {self._decode(key): count for key, count in self.counts.items()}
+        else:
+            raise AttributeError(f"{self.__class__!r} object has no attribute {attr!r}")
+        return self.__dict__[attr]
+
+    def _compute_logprobs(self) -> None:
+        """Compute the log-probabilities of the seen n-grams.
+
+        The log-probability of an unseen n-gram only depends on its n-1 gram
+        prefix, so these are stored by the key of the prefix.
+        """
+        counts = self.counts
+        ngrams = self._base ** (self.order - 1)  # the smallest key of an n-gram
+        denominator_prior = len(self.alphabet) * self.ngramprior
+        self.logprobs: dict[int, float] = {}
+        self.unseen_logprobs: dict[int, float] = {}
+        # Most n-grams are seen once or a few times, so the same values recur
+        values: dict[tuple[int, int], float] = {}
+        for key, count in counts.items():
+            if key >= ngrams:
+                counts_pair = (count, counts.get(key // self._base, 0))
+                logprobs = self.logprobs
+            else:
+                counts_pair = (0, count)
+                logprobs = self.unseen_logprobs
+            if counts_pair not in values:
+                numerator = counts_pair[0] + self.ngramprior
+                denominator = counts_pair[1] + denominator_prior
+                values[counts_pair] = math.log(numerator / float(denominator))
+            logprobs[key] = values[counts_pair]
+
+    def _decode(self, key: int) -> str:
+        chars = []
+        while key:
+            key, code = divmod(key, self._base)
+            chars.append(self._symbols[code - 1])
+        return "".join(reversed(chars))
 
     def evaluate(self, string: str) -> float:  # noqa: D102
-        s = "#" * (self.order - 1) + string + "#"
-        return sum(self._getprob(x) for x in self._letter_ngrams(s, self.order))
-
-    def _getprob(self, ngram) -> float:  # noqa: ANN001
-        numerator = self.ngramcounts.get(ngram, 0) + self.ngramprior
-        denominator = self.ngramcounts.get(ngram[:-1], 0) + len(self.alphabet) * self.ngramprior
-        return math.log(numerator / float(denominator))
-
-    @staticmethod
-    def _letter_ngrams(word: str, n: int) -> list[str]:
-        return ["".join(x) for x in zip(*[word[i:] for i in range(n)])]
+        return self.evaluate_many([string])[0]
+
+    def evaluate_many(self, strings: Iterable[str]) -> list[float]:
+        """Return the log-probability of each of strings."""
+        logprobs = self.logprobs
+        unseen_logprobs = self.unseen_logprobs
+        codes = self._codes
+        base = self._base
+        mod = self._mod
+        unseen = math.log(self.ngramprior / float(len(self.alphabet) * self.ngramprior))
+        end = codes.get("#", 0)
+        scores: list[float] = []
+        for string in strings:
+            key = self._start
+            score = 0.0
+            for char in string:
+                key = (key * base + codes.get(char, 0)) % mod
+                logprob = logprobs.get(key)
+                if logprob is None:
+                    logprob = unseen_logprobs.get(key // base, unseen)
+                score += logprob
+            key = (key * base + end) % mod
+            logprob = logprobs.get(key)
+            score += logprob if logprob is not None else unseen_logprobs.get(key // base, unseen)
+            scores.append(score)
+        return scores
+
+
+# The coding of the last coded alphabet, so that models with the same
+# alphabet also share its coding: alphabet -> (symbols, codes)
+_alphabet_coding: dict[frozenset[str], tuple[list[str], dict[str, int]]] = {}
+
+
+def lms_size(lms: dict[str, tuple[float, list[StringNgram]]]) -> int:
+    """Return the approximate memory use in bytes of the n-gram models in lms.
+
+    Models and alphabets that are shared are only counted once, and tables
+    that are not computed or loaded yet are not counted.
+    """
+    seen: set[int] = set()
+    size = 0
+    for _, models in lms.values():
+        for model in models:
+            if id(model) in seen:
+                continue
+            seen.add(id(model))
+            size += sys.getsizeof(model) + sys.getsizeof(model.__dict__)
+            for attr in ("counts", "logprobs", "unseen_logprobs", "ngramcounts"):
+                table = model.__dict__.get(attr)
+                if table is not None and id(table) not in seen:
+                    seen.add(id(table))
+                    size += sys.getsizeof(table) + sum(
+                        sys.getsizeof(key) + sys.getsizeof(value) for key, value in table.items()
+                    )
+            for attr in ("alphabet", "_codes"):
+                shared = model.__dict__.get(attr)
+                if shared is not None and id(shared) not in seen:
+                    seen.add(id(shared))
+                    size += sys.getsizeof(shared)
+    return size
 
 
 def _paradigms_to_alphabet(paradigms: list[paradigm.Paradigm]) -> set[str]:
@@ -57,6 +227,130 @@ def _paradigms_to_alphabet(paradigms: list[paradigm.Paradigm]) -> set[str]:
     return alphabet - {"_"}
 
 
+class ParadigmIndex:
+    """Index over the literal anchors of the forms of a list of paradigms.
+
+    A form like ``1+ä+2+er`` can only match words that start with its first
+    literal (here "") and end with its last literal ("er"), and that have at
+    least one character per variable on top of its literals. The forms are
+    indexed on these anchors, so finding the forms that may match a word only
+    takes a few dictionary lookups of the word's prefixes and suffixes instead
+    of matching every form.
+
+    The forms are also indexed on their msd (msds), so that the candidates
+    of a tagged word are only the forms with its tag.
+
+    Args:
+       paradigms:list(Paradigm)
+            The paradigms to index, the same list that is later given to
+            `test_paradigms`.
+    """
+
+    def __init__(self, paradigms: list[paradigm.Paradigm]) -> None:  # noqa: D107
+        # (first literal, last literal) -> [(min length, paradigm index, form index)]
+        self.anchors: dict[tuple[str, str], list[tuple[int, int, int]]] = {}
+        # forms without variables: word -> [(paradigm index, form index)]
+        self.exact: dict[str, list[tuple[int, int]]] = {}
+        # msd_key of msd -> [(paradigm index, form index)]
+        self.msds: dict[Any, list[tuple[int, int]]] = {}
+        for pi, p in enumerate(paradigms):
+            for key, indices in p.msd_forms.items():
+                self.msds.setdefault(key, []).extend((pi, fi) for fi in indices)
+            for fi, f in enumerate(p.forms):
+                literals = _form_literals(f.form)
+                if len(literals) == 1:
+                    self.exact.setdefault(literals[0], []).append((pi, fi))
+                else:
+                    minlen = sum(len(lit) for lit in literals) + len(literals) - 1
+                    self.anchors.setdefault((literals[0], literals[-1]), []).append(
+                        (minlen, pi, fi)
+                    )
+        self._anchor_lengths()
+
+    @classmethod
+    def from_entries(
+        cls,
+        anchors: dict[tuple[str, str], list[tuple[int, int, int]]],
+        exact: dict[str, list[tuple[int, int]]],
+        msds: Optional[dict[Any, list[tuple[int, int]]]] = None,
+    ) -> "ParadigmIndex":
+        """Create an index from the anchors, exact and msds attributes of another index."""
+        index = cls([])
+        index.anchors = anchors
+        index.exact = exact
+        index.msds = msds or {}
+        index._anchor_lengths()
+        return index
+
+    def _anchor_lengths(self) -> None:
+        self.head_lengths = sorted({len(head) for head, _ in self.anchors})
+        self.tail_lengths = sorted({len(tail) for _, tail in self.anchors})
+        self._tagged: dict[Any, frozenset[tuple[int, int]]] = {}
+
+    def lookup(self, w: str, tag: Any = "") -> list[tuple[int, int]]:
+        """Return the (paradigm index, form index) of the forms that may match w.
+
+        With a tag, only the forms with that msd are returned.
+        """
+        found = self._lookup(w)
+        if not tag:
+            return found
+        key = paradigm.msd_key(tag)
+        if key not in self._tagged:
+            self._tagged[key] = frozenset(self.msds.get(key, ()))
+        tagged = self._tagged[key]
+        return [entry for entry in found if entry in tagged]
+
+    def _lookup(self, w: str) -> list[tuple[int, int]]:
+        found = list(self.exact.get(w, ()))
+        n = len(w)
+        for i in self.head_lengths:
+            if i > n:
+                break
+            head = w[:i]
+            for j in self.tail_lengths:
+                if i + j > n:
+                    break
+                entries = self.anchors.get((head, w[n - j :]))
+                if entries:
+                    found.extend((pi, fi) for minlen, pi, fi in entries if minlen <= n)
+        return found
+
+    def candidates(self, words: Iterable[str], tags: Sequence = ()) -> list[int]:
+        """Return the indices of the paradigms that may match all words, in order.
+
+        A word with a tag in tags may only match the forms with that msd.
+        """
+        common: Optional[set[int]] = None
+        for ix, w in enumerate(words):
+            tag = tags[ix] if len(tags) > ix else ""
+            found = {pi for pi, _ in self.lookup(w, tag)}
+            common = found if common is None else common & found
+            if not common:
+                return []
+        return sorted(common or ())
+
+
+def _form_literals(form: list[str]) -> list[str]:
+    """Split the parts of a form into the literals around its variables.
+
+    Gives the same literals as the `regexmatcher.MRegex` of the form, without
+    compiling it, so that indexing lazy forms leaves them uncompiled.
+    """
+    literals = [""]
+    for part in form:
+        if part.isdigit():
+            literals.append("")
+        else:
+            literals[-1] += part
+    return literals
+
+
+def build_index(paradigms: list[paradigm.Paradigm]) -> ParadigmIndex:
+    """Build the candidate index that `test_paradigms` can use to skip paradigms."""
+    return ParadigmIndex(paradigms)
+
+
 def _eval_vars(matches: list[str], lm: tuple[float, list[StringNgram]]):  # noqa: ANN202
     if not lm[1]:
         # If paradigm does not have any instances.
@@ -67,31 +361,70 @@ def _eval_vars(matches: list[str], lm: tuple[float, list[StringNgram]]):  # noqa
     return sum(lm[1][midx].evaluate(m) for midx, m in enumerate(matches))
 
 
+def _eval_vars_many(
+    variables: Sequence[Sequence[str]], lm: tuple[float, list[StringNgram]]
+) -> list[float]:
+    """Return `_eval_vars` of each variable assignment, evaluating each slot model once."""
+    if not lm[1]:
+        return [-100.0] * len(variables)
+    scores = [0.0] * len(variables)
+    for midx in range(max(map(len, variables), default=0)):
+        indices = [i for i, v in enumerate(variables) if len(v) > midx]
+        slot_scores = lm[1][midx].evaluate_many([variables[i][midx] for i in indices])
+        for i, score in zip(indices, slot_scores):
+            scores[i] += score
+    return scores
+
+
 def eval_multiple_entries(
     p: paradigm.Paradigm,
     words: list[str],
     tags: Sequence[str] = (),
     baseform: bool = False,
-) -> set[tuple[int, Any]]:
-    """Return a set of consistent variable assignment to all words."""
-    wmatches: list[set] = []
+    cache: Optional[MutableMapping] = None,
+) -> set[tuple[str, ...]]:
+    """Return a set of consistent variable assignment to all words.
+
+    Only the most selective word, one with a tag or restricted to the
+    baseform if there is one, is matched against the forms. The assignments
+    it gives are then checked against the forms of each of the other words,
+    until none are left.
+    """
+    if cache is None:
+        cache = match_cache
+    selections = []
     for ix, w in enumerate(words):
         tag = tags[ix] if len(tags) > ix else ""
-        wmatch = set()
         restrict = not tag and ix == 0 and baseform
-        matches = p.match(w, constrained=False, tag=tag, baseform=restrict)
-        for m in filter(lambda x: x is not None, matches):
-            if not m:
-                m = [(0, ())]  # Add dummy to show match is exact without vars  # noqa: PLW2901
-            for submatch in m:
-                if len(submatch) > 0:
-                    wmatch.add(submatch[1])
-        wmatches.append(wmatch)
-
-    def _union(x, y):  # noqa: FURB118, ANN202, ANN001
-        return x & y
-
-    return functools.reduce(_union, wmatches)
+        selections.append((w, tag, restrict))
+    if not selections:
+        return set()
+    selections.sort(key=lambda selection: not (selection[1] or selection[2]))
+
+    w, tag, restrict = selections[0]
+    variables: set[tuple[str, ...]] = set()
+    for m in p.match(w, constrained=False, tag=tag, baseform=restrict, cache=cache):
+        if m is None:
+            continue
+        if not m:
+            variables.add(())  # the match is exact without vars
+        variables.update(submatch[1] for submatch in m)
+
+    for w, tag, restrict in selections[1:]:
+        if not variables:
+            break
+        forms = p.tagged_forms(tag) if tag else p.forms[:1] if restrict else p.forms
+        variables = {v for v in variables if any(_instantiates(f, v, w) for f in forms)}
+    return variables
+
+
+def _instantiates(f: paradigm.Form, v: tuple[str, ...], w: str) -> bool:
+    """Return True if the form f with the variables v is w, i.e. if f matches w with v."""
+    return (
+        f.matcher.numgroups == len(v)
+        and f.scount + sum(map(len, v)) == len(w)
+        and "".join(f(*v)[0]) == w
+    )
 
 
 def eval_baseform(
@@ -129,7 +462,22 @@ def build(  # noqa: D103
 
     numexamples = sum(x.count for x in paradigms)
 
-    lms = {p.uuid: _lms_paradigm(p, alphabet, ngramorder, ngramprior) for p in paradigms}
+    # All models share one alphabet (with the padding symbol of StringNgram),
+    # and slots with the same instances share a model.
+    model_alphabet = frozenset(alphabet | {"#"})
+    slotmodels: dict[tuple[str, ...], StringNgram] = {}
+    lms = {
+        p.uuid: _lms_paradigm(p, model_alphabet, ngramorder, ngramprior, slotmodels)
+        for p in paradigms
+    }
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "built %d n-gram models for %d slots of %d paradigms, about %.1f MB",
+            len(slotmodels),
+            sum(len(models) for _, models in lms.values()),
+            len(paradigms),
+            lms_size(lms) / 1e6,
+        )
     return paradigms, numexamples, lms, alphabet
 
 
@@ -138,14 +486,20 @@ def _lms_paradigm(
     alphabet,  # noqa: ANN001
     ngramorder,  # noqa: ANN001
     ngramprior,  # noqa: ANN001
+    slotmodels: Optional[dict[tuple[str, ...], StringNgram]] = None,
 ) -> tuple[float, list[StringNgram]]:
+    if slotmodels is None:
+        slotmodels = {}
     numvars = (len(paradigm_.slots) - 1) / 2
-    slotmodels = []
+    models = []
     for v in range(int(numvars)):
-        varinsts = paradigm_.slots[v * 2 + 1][1]
-        model = StringNgram(varinsts, alphabet=alphabet, order=ngramorder, ngramprior=ngramprior)
-        slotmodels.append(model)
-    return numvars, slotmodels
+        varinsts = tuple(paradigm_.slots[v * 2 + 1][1])
+        if varinsts not in slotmodels:
+            slotmodels[varinsts] = StringNgram(
+                varinsts, alphabet=alphabet, order=ngramorder, ngramprior=ngramprior
+            )
+        models.append(slotmodels[varinsts])
+    return numvars, models
 
 
 def test_paradigms(  # noqa: ANN201, D103
@@ -156,58 +510,173 @@ def test_paradigms(  # noqa: ANN201, D103
     pprior: float,
     match_all: bool = False,
     baseform: bool = False,
+    index: Optional[ParadigmIndex] = None,
+    cache: Optional[MutableMapping] = None,
+    kbest: Optional[int] = None,
 ):
-    tags: list = []
-    # sourcery skip: no-conditionals-in-tests
+    words, tags = _split_input(inp)
+    if len(words) == 0:
+        return []
+    if index is not None:
+        paradigms = [paradigms[i] for i in index.candidates(words, tags)]
+    if cache is None:
+        cache = match_cache
+    return _analyze(
+        words, tags, paradigms, numexamples, lms, pprior, match_all, baseform, cache, kbest
+    )
+
+
+def analyze_batch(
+    inputs: Iterable[Union[list[str], tuple[list[str], list[str]]]],
+    paradigms: list[paradigm.Paradigm],
+    numexamples: int,
+    lms: dict[str, tuple[float, list[StringNgram]]],
+    pprior: float,
+    match_all: bool = False,
+    baseform: bool = False,
+    index: Optional[ParadigmIndex] = None,
+    cache: Optional[MutableMapping] = None,
+    batch_size: int = 1024,
+    kbest: Optional[int] = None,
+) -> Iterator[list[tuple[float, paradigm.Paradigm, Iterable[str]]]]:
+    """Analyze many inputs, yielding the result of `test_paradigms` for each in order.
+
+    The inputs are read in batches of batch_size. Within a batch, identical
+    inputs are only analyzed once, and the candidate paradigms of each
+    distinct word are only looked up once. Inputs with the same candidates
+    share the list of candidate paradigms, but each input is still matched
+    and scored on its own. The match results of a form and a word are shared
+    between all inputs through cache, so repeated words are only matched once.
+
+    The same result list is yielded for identical inputs of a batch. When no
+    cache is given, the process-wide `match_cache` is used. With kbest, only
+    the kbest best analyses of each input are kept, see `_analyze`.
+    """
+    if index is None:
+        index = build_index(paradigms)
+    if cache is None:
+        cache = match_cache
+    inputs = iter(inputs)
+    while batch := list(itertools.islice(inputs, batch_size)):
+        keys = [_input_key(inp) for inp in batch]
+        # first input of each distinct key, later replaced by its analyses
+        distinct: dict[tuple, Any] = {}
+        for key, inp in zip(keys, batch):
+            distinct.setdefault(key, inp)
+        word_candidates: dict[tuple, frozenset[int]] = {}
+        groups: dict[tuple[int, ...], list[tuple]] = {}
+        for key in distinct:
+            key_words, key_tags = key
+            common: Optional[frozenset[int]] = None
+            for ix, w in enumerate(key_words):
+                word = (w, key_tags[ix] if len(key_tags) > ix else "")
+                if word not in word_candidates:
+                    word_candidates[word] = frozenset(pi for pi, _ in index.lookup(*word))
+                found = word_candidates[word]
+                common = found if common is None else common & found
+            groups.setdefault(tuple(sorted(common or ())), []).append(key)
+        for candidates, group in groups.items():
+            candidate_paradigms = [paradigms[i] for i in candidates]
+            for key in group:
+                words, tags = _split_input(distinct[key])
+                distinct[key] = (
+                    _analyze(
+                        words,
+                        tags,
+                        candidate_paradigms,
+                        numexamples,
+                        lms,
+                        pprior,
+                        match_all,
+                        baseform,
+                        cache,
+                        kbest,
+                    )
+                    if words
+                    else []
+                )
+        for key in keys:
+            yield distinct[key]
+
+
+def _split_input(inp: Union[list[str], tuple[list[str], list[str]]]) -> tuple[list[str], list]:
     if isinstance(inp, tuple):
         words, tags = inp
-    else:
-        words = inp
+        return words, tags
+    return inp, []
 
-    if len(words) == 0:
-        return []
 
-    # Quick filter out most paradigms
-    if tags:
-        table = list(zip(words, tags))
-        fittingparadigms = [
-            p
-            for p in paradigms
-            if all(p.fits_paradigm(w, constrained=False, tag=t) for w, t in table)
-        ]
-    else:
-        fittingparadigms = [
-            p for p in paradigms if all(p.fits_paradigm(w, constrained=False) for w in words)
-        ]
-
-    fittingparadigms = list(
-        filter(
-            lambda p: eval_multiple_entries(p, words, tags, baseform=baseform),
-            fittingparadigms,
-        )
-    )
+def _input_key(inp: Union[list[str], tuple[list[str], list[str]]]) -> tuple[tuple, tuple]:
+    words, tags = _split_input(inp)
+    return tuple(words), tuple(paradigm.msd_key(t) for t in tags)
 
-    analyses = []
-    # Calculate score for each possible variable assignment
-    # sourcery skip: no-loop-in-tests
-    for p in fittingparadigms:
-        lm_score = lms[p.uuid]
-        match_table = list(zip(words, tags)) if match_all else []
-        analyses.extend(
-            test_paradigm(
-                p,
-                words,
-                numexamples,
-                pprior,
-                lm_score,
-                tags=tags,
-                match_table=match_table,
-                baseform=baseform,
-            )
+
+def _analyze(
+    words: list[str],
+    tags: list,
+    paradigms: list[paradigm.Paradigm],
+    numexamples: int,
+    lms: dict[str, tuple[float, list[StringNgram]]],
+    pprior: float,
+    match_all: bool,
+    baseform: bool,
+    cache: MutableMapping,
+    kbest: Optional[int] = None,
+) -> list[tuple[float, paradigm.Paradigm, Iterable[str]]]:
+    """Score the paradigms among the candidates that fit words, best first.
+
+    With kbest, the result is the first kbest analyses of the full result.
+    The scores of n-gram models of order 2 or more are never positive, so no
+    analysis of a paradigm with such slot models scores better than its
+    weighted prior. The paradigms are tried from the best prior down, and the
+    rest are skipped as soon as their prior cannot beat the kbest analyses
+    found so far. Unigram scores can be positive, so a paradigm with a
+    unigram slot model has no bound and is always scored.
+    """
+    match_table = list(zip(words, tags)) if match_all else []
+
+    def score(p: paradigm.Paradigm) -> list[tuple[float, paradigm.Paradigm, Iterable[str]]]:
+        # Calculate score for each possible variable assignment. This also
+        # filters out the paradigms that do not fit, as they have none.
+        variables = eval_multiple_entries(p, words, tags, baseform=baseform, cache=cache)
+        if not variables:
+            return []
+        return _score_paradigm(
+            p, words, numexamples, pprior, lms[p.uuid], variables, match_table=match_table
         )
 
-    analyses.sort(reverse=True, key=operator.itemgetter(0))
-    return analyses
+    if kbest is None:
+        analyses = []
+        for p in paradigms:
+            analyses.extend(score(p))
+        analyses.sort(reverse=True, key=operator.itemgetter(0))
+        return analyses
+
+    if kbest < 1:
+        return []
+    # The heap holds the kbest analyses as (score, -position, -rank, analysis),
+    # so that its smallest item is the one that comes last in the full result.
+    heap: list[tuple[float, int, int, tuple]] = []
+    bounds = []
+    for pos, p in enumerate(paradigms):
+        if any(model.order <= 1 for model in lms[p.uuid][1]):
+            bounds.append((math.inf, -pos))
+        else:
+            bounds.append((_prior(p, numexamples) * pprior, -pos))
+    bounds.sort(reverse=True)
+    for bound, negpos in bounds:
+        if len(heap) == kbest:
+            if bound < heap[0][0]:
+                break
+            if (bound, negpos) < heap[0][:2]:
+                continue
+        for rank, analysis in enumerate(score(paradigms[-negpos])):
+            item = (analysis[0], negpos, -rank, analysis)
+            if len(heap) < kbest:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heappushpop(heap, item)
+    return [item[3] for item in sorted(heap, reverse=True)]
 
 
 def run_paradigms(  # noqa: D103
@@ -242,19 +711,32 @@ def test_paradigm(  # noqa: D103
     tags: Sequence = (),
     match_table=(),  # noqa: ANN001
     baseform=False,  # noqa: ANN001
+    cache: Optional[MutableMapping] = None,
 ) -> list[tuple[float, paradigm.Paradigm, Iterable[str]]]:
-    res = []
-    try:
-        prior = math.log(para.count / float(numexamples))
-    except ValueError:
-        prior = 0
     # All possible instantiations
-    variables = eval_multiple_entries(para, words, tags, baseform=baseform)
+    variables = eval_multiple_entries(para, words, tags, baseform=baseform, cache=cache)
+    return _score_paradigm(
+        para, words, numexamples, pprior, lm_score, variables, match_table=match_table
+    )
+
+
+def _score_paradigm(
+    para: paradigm.Paradigm,
+    words: list[str],
+    numexamples: int,
+    pprior: float,
+    lm_score: tuple[float, list[StringNgram]],
+    variables: set[tuple[str, ...]],
+    match_table=(),  # noqa: ANN001
+) -> list[tuple[float, paradigm.Paradigm, Iterable[str]]]:
+    res: list[tuple[float, paradigm.Paradigm, Iterable[str]]] = []
+    prior = _prior(para, numexamples)
     if len(variables) == 0:
         score = prior
         return [(score, para, ())]
-    for v in variables:
-        score = prior * pprior + len(words) * _eval_vars(v, lm_score)
+    assignments = list(variables)
+    for v, lm in zip(assignments, _eval_vars_many(assignments, lm_score)):
+        score = prior * pprior + len(words) * lm
         res.append((score, para, v))
 
     def match(_p, _v, table):  # noqa: ANN202, ANN001
@@ -266,3 +748,10 @@ def test_paradigm(  # noqa: D103
     if match_table:
         res = [(s, p, v) for (s, p, v) in res if match(p, v, match_table)]
     return res
+
+
+def _prior(para: paradigm.Paradigm, numexamples: int) -> float:
+    try:
+        return math.log(para.count / float(numexamples))
+    except ValueError:
+        return 0
@@ -0,0 +1,476 @@
+"""Long-running morphological analysis with a pool of worker processes.
+
+The model is built once in the parent process. The workers are forked from
+it and share the built paradigms and n-gram models copy-on-write, so starting
+them is cheap and nothing has to be pickled except the input lines and the
+formatted results.
+
+Example usage:
+    paradigms, numexamples, lms, _ = morphparser.build(paradigms, 3, 0.01)
+    model = morphserver.Model(paradigms, numexamples, lms, kbest=3)
+    with morphserver.AnalysisPool(model, workers=4) as pool:
+        for result in pool.analyze(sys.stdin):
+            sys.stdout.write(result)
+
+or, from asyncio code:
+    async with morphserver.AsyncAnalyzer(model, workers=4) as analyzer:
+        analyses = await analyzer.analyze(["coger", "cojo"])
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import itertools
+import logging
+import multiprocessing
+import os
+import select
+import socketserver
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+from typing import Optional, Union
+
+from paradigmextract import morphparser, paradigm
+
+logger = logging.getLogger(__name__)
+
+# The model of the worker processes, set by _set_model when they start.
+_model: Optional["Model"] = None
+
+
+class Model:
+    """A built morphparser model and the options for analyzing and printing.
+
+    Args:
+       paradigms, numexamples, lms:
+            As returned by `morphparser.build`.
+       pprior:float
+            The weight of the paradigm prior, see `morphparser.test_paradigms`.
+       kbest:int
+            The number of analyses to print for each input.
+       print_tables:bool
+            Also print the entire table of each analysis.
+       debug:bool
+            Also print the members of the paradigm of each analysis.
+       index:ParadigmIndex
+            The candidate index, built from paradigms if not given.
+    """
+
+    def __init__(  # noqa: D107
+        self,
+        paradigms: list[paradigm.Paradigm],
+        numexamples: int,
+        lms: dict[str, tuple[float, list[morphparser.StringNgram]]],
+        pprior: float = 1.0,
+        kbest: int = 1,
+        print_tables: bool = False,
+        debug: bool = False,
+        index: Optional[morphparser.ParadigmIndex] = None,
+    ) -> None:
+        self.paradigms = paradigms
+        self.numexamples = numexamples
+        self.lms = lms
+        self.pprior = pprior
+        self.kbest = kbest
+        self.print_tables = print_tables
+        self.debug = debug
+        self.index = index if index is not None else morphparser.build_index(paradigms)
+        self._positions = {id(p): i for i, p in enumerate(paradigms)}
+
+    def analyze_inputs(
+        self, inputs: list[Union[list[str], tuple[list[str], list[str]]]]
+    ) -> list[list[tuple[float, int, tuple[str, ...]]]]:
+        """Analyze inputs like `morphparser.test_paradigms`.
+
+        The analyses refer to the paradigms by their index in the model, so
+        that they can be sent between processes cheaply.
+        """
+        results = morphparser.analyze_batch(
+            inputs,
+            self.paradigms,
+            self.numexamples,
+            self.lms,
+            self.pprior,
+            index=self.index,
+            batch_size=max(len(inputs), 1),
+        )
+        return [
+            [(score, self._positions[id(p)], tuple(v)) for score, p, v in analyses]
+            for analyses in results
+        ]
+
+    def analyze_lines(self, lines: list[str]) -> list[str]:
+        """Analyze lines of whitespace-separated words and format the results."""
+        inputs = [line.split() for line in lines]
+        results = morphparser.analyze_batch(
+            inputs,
+            self.paradigms,
+            self.numexamples,
+            self.lms,
+            self.pprior,
+            index=self.index,
+            batch_size=max(len(inputs), 1),
+            kbest=self.kbest,
+        )
+        return [
+            format_analyses(
+                words,
+                analyses,
+                kbest=self.kbest,
+                print_tables=self.print_tables,
+                debug=self.debug,
+            )
+            for words, analyses in zip(inputs, results)
+        ]
+
+
+def format_analyses(
+    words: list[str],
+    analyses: list[tuple[float, paradigm.Paradigm, Iterable[str]]],
+    kbest: int = 1,
+    print_tables: bool = False,
+    debug: bool = False,
+) -> str:
+    """Format the kbest analyses of words, one per line, followed by an empty line.
+
+    Each analysis is printed as
+    ``SCORE NAME_OF_PARADIGM (1=VAR1,...) WORDFORM1:BASEFORM,MSD#WORDFORM2:...``
+    """
+    out = []
+    for score, p, v in analyses[:kbest]:
+        varstring = "(" + ",".join(f"{i}={val}" for i, val in enumerate(v, start=1)) + ")"
+        table = p(*v)  # Instantiate table with vars from analysis
+        baseform = table[0][0]
+        wordformlist = [
+            f"{form}:{baseform},{_msdstring(msd)}" for form, msd in table if form in words
+        ]
+        out.append(f"{score} {p.name} {varstring} {'#'.join(wordformlist)}\n")
+        if print_tables:
+            for form, msd in table:
+                if form in words:
+                    form = f"*{form}*"  # noqa: PLW2901
+                out.append(f"{form}\t{_msdstring(msd)}\n")
+        if debug:
+            members = ", ".join(p(*[var[1] for var in vs])[0][0] for vs in p.var_insts)
+            out.append(f"Members: {members}\n")
+    out.append("\n")
+    return "".join(out)
+
+
+def _msdstring(msd: list[tuple[Optional[str], str]]) -> str:
+    return ",".join(value if feat is None else f"{feat}={value}" for feat, value in msd)
+
+
+def _set_model(model: "Model") -> None:
+    global _model  # noqa: PLW0603
+    _model = model
+
+
+def _worker_model() -> "Model":
+    if _model is None:
+        raise RuntimeError("the worker process was not given a model")
+    return _model
+
+
+def _analyze_lines(lines: list[str]) -> list[str]:
+    return _worker_model().analyze_lines(lines)
+
+
+def _analyze_inputs(inputs: list) -> list[list[tuple[float, int, tuple[str, ...]]]]:
+    return _worker_model().analyze_inputs(inputs)
+
+
+class AnalysisPool:
+    """Analyze lines with a model in a pool of forked worker processes.
+
+    Args:
+       model:Model
+            The model. It is inherited by the workers when they are forked.
+       workers:int
+            The number of worker processes, None for one per CPU. With 1 the
+            lines are analyzed in the calling process.
+       batch_size:int
+            The number of lines sent to a worker at a time.
+    """
+
+    def __init__(  # noqa: D107
+        self, model: Model, workers: Optional[int] = None, batch_size: int = 64
+    ) -> None:
+        self.model = model
+        self.batch_size = batch_size
+        self._pool = None
+        workers = workers or os.cpu_count() or 1
+        if workers > 1:
+            # Forked workers get the model without pickling it
+            self._pool = multiprocessing.get_context("fork").Pool(
+                workers, initializer=_set_model, initargs=(model,)
+            )
+        # Keep a couple of batches per worker in flight, but do not read
+        # further ahead than that.
+        self.max_pending = 2 * workers
+
+    def analyze(self, lines: Iterable[str]) -> Iterator[str]:
+        """Yield the formatted analyses of lines, in order."""
+        batches = _batches(lines, self.batch_size)
+        if self._pool is None:
+            for batch in batches:
+                yield from self.model.analyze_lines(batch)
+            return
+        pending: collections.deque = collections.deque()
+        for batch in batches:
+            pending.append(self._pool.apply_async(_analyze_lines, (batch,)))
+            if len(pending) >= self.max_pending:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self) -> "AnalysisPool":  # noqa: D105
+        return self
+
+    def __exit__(self, *exc_info) -> None:  # noqa: D105, ANN002
+        self.close()
+
+
+def _batches(lines: Iterable[str], size: int) -> Iterator[list[str]]:
+    lines = iter(lines)
+    while batch := list(itertools.islice(lines, size)):
+        yield batch
+
+
+class _AnalysisHandler(socketserver.BaseRequestHandler):
+    server: "UnixSocketServer"
+
+    def handle(self) -> None:
+        sock = self.request
+        # Enough lines to keep all the workers of the pool busy
+        max_lines = self.server.pool.batch_size * self.server.pool.max_pending
+        pending = b""
+        eof = False
+        while not eof:
+            chunk = sock.recv(_RECV_SIZE)
+            eof = not chunk
+            pending += chunk
+            # Take what else the client sends right away, so that it is analyzed
+            # in full batches, but do not wait for more than flush_delay.
+            while (
+                not eof
+                and pending.count(b"\n") < max_lines
+                and select.select([sock], [], [], self.server.flush_delay)[0]
+            ):
+                chunk = sock.recv(_RECV_SIZE)
+                eof = not chunk
+                pending += chunk
+            *lines, pending = pending.split(b"\n")
+            if eof and pending:
+                lines.append(pending)
+            for result in self.server.pool.analyze(line.decode("utf-8") for line in lines):
+                sock.sendall(result.encode("utf-8"))
+
+
+_RECV_SIZE = 65536
+
+
+class UnixSocketServer(socketserver.ThreadingUnixStreamServer):
+    """Serve analyses on a Unix socket.
+
+    A client writes lines of whitespace-separated words and gets the analyses
+    of each line back, in order. The lines a client has sent are analyzed in
+    batches of the pool's batch size; when no more lines arrive within
+    flush_delay seconds, the remaining lines are analyzed as a smaller batch,
+    so a client can wait for each result before sending the next line.
+
+    Args:
+       path:str
+            The path of the socket.
+       pool:AnalysisPool
+            The pool that analyzes the lines of all connections.
+       flush_delay:float
+            The time in seconds to wait for more lines before analyzing a
+            partial batch.
+    """
+
+    daemon_threads = True
+
+    def __init__(  # noqa: D107
+        self, path: str, pool: AnalysisPool, flush_delay: float = 0.005
+    ) -> None:
+        self.pool = pool
+        self.flush_delay = flush_delay
+        super().__init__(path, _AnalysisHandler)
+
+    def server_close(self) -> None:  # noqa: D102
+        super().server_close()
+        try:
+            Path(str(self.server_address)).unlink(missing_ok=True)
+        except OSError:
+            logger.warning("could not remove socket %s", self.server_address)
+
+
+class AsyncAnalyzer:
+    """Analyze requests from asyncio code in a pool of forked worker processes.
+
+    Requests that arrive while the workers are busy, or within max_delay
+    seconds of each other, are sent to a worker together as one batch. At most
+    max_queue requests wait to be batched; further calls to `analyze` wait
+    until there is room, so a flood of requests slows the callers down instead
+    of growing the queue.
+
+    Args:
+       model:Model
+            The model. It is inherited by the workers when they are forked.
+       workers:int
+            The number of worker processes, None for one per CPU.
+       max_batch:int
+            The largest number of requests in a batch.
+       max_delay:float
+            The time in seconds to wait for more requests before sending a batch.
+       max_queue:int
+            The number of requests that can wait for a batch.
+    """
+
+    def __init__(  # noqa: D107
+        self,
+        model: Model,
+        workers: Optional[int] = None,
+        max_batch: int = 64,
+        max_delay: float = 0.001,
+        max_queue: int = 1024,
+    ) -> None:
+        self.model = model
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._error: Optional[BaseException] = None
+
+    async def start(self) -> None:
+        """Start the worker processes."""
+        # The executor forks its workers when they are needed, so they are
+        # given the model as they start rather than through the global.
+        self._error = None
+        self._executor = executor = concurrent.futures.ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_set_model,
+            initargs=(self.model,),
+        )
+        queue: asyncio.Queue = asyncio.Queue(self.max_queue)
+        self._queue = queue
+        # Keep every worker busy and one more batch ready for each
+        slots = asyncio.Semaphore(2 * self.workers)
+        self._batcher = asyncio.get_running_loop().create_task(
+            self._run_batches(queue, slots, executor)
+        )
+
+    async def analyze(
+        self, words: list[str], tags: Sequence = ()
+    ) -> list[tuple[float, paradigm.Paradigm, tuple[str, ...]]]:
+        """Return the analyses of words, see `morphparser.test_paradigms`."""
+        if self._queue is None:
+            raise RuntimeError("AsyncAnalyzer is not started")
+        if self._error is not None:
+            raise self._error
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(((list(words), list(tags)) if tags else list(words), future))
+        if self._error is not None:
+            # The batcher stopped while this request waited for room
+            self._fail_queued(self._error)
+        return await future
+
+    async def _run_batches(
+        self,
+        queue: asyncio.Queue,
+        slots: asyncio.Semaphore,
+        executor: concurrent.futures.Executor,
+    ) -> None:
+        try:
+            await self._send_batches(queue, slots, executor)
+        except Exception as e:
+            # E.g. BrokenProcessPool: no request will be answered, so fail them all
+            logger.exception("analyzing a batch failed")
+            self._error = e
+            self._fail_queued(e)
+
+    async def _send_batches(
+        self,
+        queue: asyncio.Queue,
+        slots: asyncio.Semaphore,
+        executor: concurrent.futures.Executor,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            if self.max_delay and queue.qsize() < self.max_batch:
+                await asyncio.sleep(self.max_delay)
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            await slots.acquire()
+            inputs = [inp for inp, _ in batch]
+            try:
+                result = loop.run_in_executor(executor, _analyze_inputs, inputs)
+            except Exception as e:
+                slots.release()
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            result.add_done_callback(functools.partial(self._deliver, slots, batch))
+
+    def _fail_queued(self, error: BaseException) -> None:
+        # The queue is gone once the analyzer is closed
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(error)
+
+    def _deliver(self, slots: asyncio.Semaphore, batch: list, result: asyncio.Future) -> None:
+        slots.release()
+        if result.cancelled():
+            for _, future in batch:
+                future.cancel()
+            return
+        if result.exception() is not None:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(result.exception())
+            return
+        paradigms = self.model.paradigms
+        for (_, future), analyses in zip(batch, result.result()):
+            if not future.done():
+                future.set_result([(score, paradigms[i], v) for score, i, v in analyses])
+
+    async def close(self) -> None:
+        """Stop the worker processes, cancelling the requests that wait for a batch."""
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                future.cancel()
+            self._queue = None
+        if self._executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+            self._executor = None
+
+    async def __aenter__(self) -> "AsyncAnalyzer":  # noqa: D105
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:  # noqa: D105, ANN002
+        await self.close()
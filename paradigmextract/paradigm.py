@@ -1,17 +1,49 @@
 """Paradigm."""
 
+import contextlib
+import functools
+import gzip
+import io
 import logging
 import operator
 import re
-from collections import defaultdict
-from collections.abc import Sequence
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+from collections.abc import Callable, Iterable, Iterator, MutableMapping, Sequence
 from itertools import starmap
-from typing import Any, Optional
+from pathlib import Path
+from typing import IO, Any, Optional
 
 from paradigmextract import genregex, regexmatcher
 
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+
+_trace_hook: Optional[Callable[[str, dict[str, Any]], None]] = None
+
+
+def set_trace_hook(hook: Optional[Callable[[str, dict[str, Any]], None]]) -> None:
+    """Install a function that receives the trace events of the matching functions.
+
+    The hook is called as ``hook(event, fields)``, e.g.
+    ``hook("form.match_vars", {"w": "stad", "regex": "(.+)a(.+)", ...})``.
+    The same events are logged on DEBUG level. Pass None to remove the hook.
+    """
+    global _trace_hook  # noqa: PLW0603
+    _trace_hook = hook
+
+
+def _tracing() -> bool:
+    return _trace_hook is not None or logger.isEnabledFor(logging.DEBUG)
+
+
+def _trace(event: str, **fields: Any) -> None:
+    if _trace_hook is not None:
+        _trace_hook(event, fields)
+    logger.debug("%s %s", event, fields)
+
 
 class Paradigm:
     """A class representing a paradigm.
@@ -21,6 +53,15 @@ class Paradigm:
             Ex: [('1+en',[('tense','pres')]), ...,
        var_insts:list(tuple)
             Ex: [[('1','dimm')],[('1','dank')], ...]
+       v_regex:Sequence(re.Pattern)
+            The variable regexes, if already computed, see `variable_regexes`.
+       lazy:bool
+            Compile the regexes of the forms and variables when they are
+            first used, instead of up front.
+
+    The forms are indexed on their msd (msd_forms), so that matching a
+    tagged word only tries the forms with that msd. Msds are compared by
+    `msd_key`, so lists and tuples with the same items are equal.
     """
 
     def __init__(  # noqa: D107
@@ -30,6 +71,8 @@ class Paradigm:
         p_id: str = "",
         pos: str = "",
         uuid: str = "",
+        lazy: bool = False,
+        v_regex: Optional[Sequence[re.Pattern]] = None,
     ) -> None:
         logger.debug("make paradigm %s %s", p_id, uuid)
         self._p_info: dict[str, Any] = {}
@@ -39,7 +82,20 @@ class Paradigm:
         self.var_insts = var_insts
         self.p_id = p_id
 
-        self.forms.extend(Form(f, msd, var_insts) for f, msd in form_msds)
+        if lazy and v_regex is None:
+            # The forms ask the paradigm for its regexes, so they are built only once
+            self.forms.extend(
+                Form(f, msd, lazy=True, v_regex_source=self._shared_v_regex)
+                for f, msd in form_msds
+            )
+        else:
+            # All forms share the variables, and thereby their regexes
+            self.v_regex = v_regex if v_regex is not None else variable_regexes(var_insts)
+            self.forms.extend(
+                Form(f, msd, var_insts, v_regex=self.v_regex, lazy=lazy) for f, msd in form_msds
+            )
+        if not lazy:
+            self.msd_forms = self._msd_forms()
 
     def __getattr__(self, attr):  # noqa: ANN204, ANN001
         """Cache information about paradigm.
@@ -47,6 +103,12 @@ class Paradigm:
         NOTE: Stuff gets weird when the paradigm has no members,
         TODO: should naming of a paradigm really be done here?
         """
+        if attr == "v_regex":
+            self.v_regex = variable_regexes(self.var_insts)
+            return self.v_regex
+        if attr == "msd_forms":
+            self.msd_forms = self._msd_forms()
+            return self.msd_forms
         if len(self._p_info) > 0:
             return self._p_info[attr]
         if self.p_id:
@@ -89,15 +151,37 @@ class Paradigm:
                 v_index += 1
         return slts
 
+    def _shared_v_regex(self) -> Sequence[re.Pattern]:
+        """Return the variable regexes, for the lazy forms to share."""
+        return self.v_regex
+
+    def _msd_forms(self) -> dict[Any, list[int]]:
+        """Map the msd_key of each msd of the forms to the indices of its forms."""
+        msd_forms: dict[Any, list[int]] = {}
+        for i, f in enumerate(self.forms):
+            msd_forms.setdefault(msd_key(f.msd), []).append(i)
+        return msd_forms
+
+    def tagged_forms(self, tag: Any, baseform: bool = False) -> list["Form"]:
+        """Return the forms with the msd tag, only the first form if baseform."""
+        indices = self.msd_forms.get(msd_key(tag), ())
+        if baseform:
+            return self.forms[:1] if indices and indices[0] == 0 else []
+        return [self.forms[i] for i in indices]
+
     def fits_paradigm(  # noqa: D102
-        self, w: str, tag: str = "", constrained: bool = True, baseform: bool = False
+        self,
+        w: str,
+        tag: str = "",
+        constrained: bool = True,
+        baseform: bool = False,
+        cache: Optional[MutableMapping] = None,
     ) -> bool:
-        for f in self.forms:
-            if f.match(w, tag=tag, constrained=constrained):
-                return True
-            if baseform:
-                break
-        return False
+        if tag:
+            forms = self.tagged_forms(tag, baseform)
+        else:
+            forms = self.forms[:1] if baseform else self.forms
+        return any(f.match_vars(w, constrained, cache=cache) is not None for f in forms)
 
     def match(  # noqa: D102
         self,
@@ -106,29 +190,98 @@ class Paradigm:
         constrained: bool = True,
         tag: str = "",
         baseform: bool = False,
+        cache: Optional[MutableMapping] = None,
     ) -> list[Optional[list[tuple[int, Any]]]]:
-        print(  # noqa: T201
-            f"paradigm.Paradigm.match(w={w},selection={selection},constrained={constrained},tag={tag},baseform={baseform})"
-        )
+        tracing = _tracing()
+        if tracing:
+            _trace(
+                "paradigm.match",
+                w=w,
+                selection=selection,
+                constrained=constrained,
+                tag=tag,
+                baseform=baseform,
+            )
         result = []
         if selection is not None:
             forms = [self.forms[i] for i in selection]
+            if tag:
+                key = msd_key(tag)
+                forms = [f for f in forms if msd_key(f.msd) == key]
+        elif tag:
+            forms = self.tagged_forms(tag, baseform)
         elif baseform:
             forms = self.forms[:1]
         else:
             forms = self.forms
-        if tag:
-            forms = [f for f in forms if f.msd == tag]
         for f in forms:
-            xs = f.match_vars(w, constrained)
-            print(f"paradigm.Paradigm.match: xs = {xs}")  # noqa: T201
+            xs = f.match_vars(w, constrained, cache=cache)
+            if tracing:
+                _trace("paradigm.match.form", w=w, regex=f.regex, matches=xs)
             if xs and len(self.var_insts) >= 1 and len(self.var_insts[0]) > 1:
-                print(f"paradigm.Paradigm.match: sorting, {xs[0][1][1]}")  # noqa: T201
-                result.append(sorted(xs, key=lambda x: len(x[1][1])))
+                # order by the length of the second variable, if there is one
+                result.append(sorted(xs, key=lambda x: len(x[1][1]) if len(x[1]) > 1 else 0))
             else:
                 result.append(xs)
         return result
 
+    def match_table(
+        self, words: Sequence[str], tags: Sequence = (), baseform: bool = False
+    ) -> set[tuple[Optional[str], ...]]:
+        """Return the variable assignments with which the paradigm has all of words.
+
+        The words are solved jointly: once a variable is bound by matching a
+        word against a form, it is matched as a literal in the forms of the
+        other words. The words with a tag or restricted to the baseform are
+        matched first, as they have fewer forms to try. The variable regexes
+        are not checked, as in unconstrained matching.
+
+        Args:
+            words: the words
+            tags: the msd of each word, or "" to try all forms
+            baseform: the first word must be the first form
+
+        Returns:
+            tuples with the value of each variable of the paradigm, in the
+            order in which they first occur in the forms. A variable that does
+            not occur in the forms of the matched words is None.
+        """
+        todo = []
+        for ix, w in enumerate(words):
+            tag = tags[ix] if len(tags) > ix else ""
+            if tag:
+                forms = self.tagged_forms(tag)
+            else:
+                forms = self.forms[:1] if baseform and ix == 0 else self.forms
+            todo.append((len(forms) < len(self.forms), w, forms))
+        todo.sort(key=lambda x: not x[0])
+
+        solutions = []
+
+        def solve(k: int, bindings: dict[str, str]) -> None:
+            if k == len(todo):
+                solutions.append(bindings)
+                return
+            _, w, forms = todo[k]
+            for f in forms:
+                # reject most forms by their length and outer literals first
+                m = f.matcher
+                if (
+                    len(w) < m.minlen
+                    or not w.startswith(m.literals[0])
+                    or not w.endswith(m.literals[-1])
+                ):
+                    continue
+                for extended in _bind(f.form, w, bindings):
+                    solve(k + 1, extended)
+
+        if todo:
+            solve(0, {})
+        if not solutions:
+            return set()
+        names = dict.fromkeys(part for f in self.forms for part in f.form if part.isdigit())
+        return {tuple(bindings.get(name) for name in names) for bindings in solutions}
+
     def __call__(self, *insts):  # noqa: ANN204, D102, ANN002
         table = []
         for f in self.forms:
@@ -142,6 +295,44 @@ class Paradigm:
         return f"{p}\t{v}"
 
 
+def _bind(parts: list[str], w: str, bindings: dict[str, str]) -> Iterator[dict[str, str]]:
+    """Yield each extension of bindings with which the form parts make up w.
+
+    Literals and bound variables must match w exactly, and each unbound
+    variable takes one or more characters. When an unbound variable is
+    followed by a literal or a bound variable, it can only end where that
+    occurs in w.
+    """
+    stack = [(0, 0, bindings)]
+    while stack:
+        i, pos, b = stack.pop()
+        if i == len(parts):
+            if pos == len(w):
+                yield b
+            continue
+        part = parts[i]
+        value = b.get(part) if part.isdigit() else part
+        if value is not None:
+            if w.startswith(value, pos):
+                stack.append((i + 1, pos + len(value), b))
+            continue
+        if i + 1 == len(parts):
+            if pos < len(w):
+                stack.append((i + 1, len(w), {**b, part: w[pos:]}))
+            continue
+        nxt = parts[i + 1]
+        anchor = b.get(nxt) if nxt.isdigit() else nxt
+        if anchor and nxt != part:
+            end = w.find(anchor, pos + 1)
+            while end != -1:
+                stack.append((i + 1, end, {**b, part: w[pos:end]}))
+                end = w.find(anchor, end + 1)
+        else:
+            stack.extend(
+                (i + 1, end, {**b, part: w[pos:end]}) for end in range(pos + 1, len(w) + 1)
+            )
+
+
 class Form:
     """A class representing a paradigmatic wordform and, possibly, its morphosyntactic description.
 
@@ -152,6 +343,16 @@ class Form:
             Ex: [('num','sg'),('case':'nom') .. ]
                 [] no msd available
                 [(None,'SGNOM')] no msd type available
+       v_insts:list(list(tuple))
+            The variable instances of the paradigm, see `Paradigm`.
+       v_regex:Sequence(re.Pattern)
+            The regexes for v_insts, if already computed.
+       lazy:bool
+            Only keep the form and msd, and compile the regexes (regex, cregex,
+            matcher, scount) and the variable regexes (v_regex) on first use.
+       v_regex_source:Callable
+            For lazy forms, returns the variable regexes on first use instead
+            of compiling them from v_insts, e.g. to share them with the paradigm.
     """  # noqa: E501
 
     def __init__(  # noqa: D107
@@ -159,11 +360,34 @@ class Form:
         form: str,
         msd: list[tuple[Optional[str], str]] = (),
         v_insts: Sequence[list[tuple[str, Any]]] = (),
+        v_regex: Optional[Sequence[re.Pattern]] = None,
+        lazy: bool = False,
+        v_regex_source: Optional[Callable[[], Sequence[re.Pattern]]] = None,
     ) -> None:
         self.form: list[str] = form.split("+")
         self.msd = msd
-        self.scount: int = 0
         # self.identifier = len(msd) > 0 and len(msd[0]) > 1 and msd[0][1] == "identifier"
+        if v_regex is not None:
+            self.v_regex = v_regex
+        elif lazy:
+            self._v_source = v_regex_source or functools.partial(variable_regexes, v_insts)
+        else:
+            self.v_regex = variable_regexes(v_insts)
+        if not lazy:
+            self._compile()
+
+    def __getattr__(self, attr):  # noqa: ANN204, ANN001
+        """Compile the regexes of a lazy form on first use."""
+        if attr in {"scount", "regex", "cregex", "matcher"}:
+            self._compile()
+        elif attr == "v_regex":
+            self.v_regex = self.__dict__.pop("_v_source")()
+        else:
+            raise AttributeError(f"{self.__class__!r} object has no attribute {attr!r}")
+        return self.__dict__[attr]
+
+    def _compile(self) -> None:
+        self.scount: int = 0
         r = ""
         for f in self.form:
             if f.isdigit():
@@ -173,18 +397,7 @@ class Form:
                 self.scount += len(f)
         self.regex = r
         self.cregex = re.compile(self.regex)
-        # vars
-        collect_vars: dict[str, set[str]] = defaultdict(set)
-        for vs in v_insts:
-            for i, v in vs:
-                collect_vars[i].add(v)
-        self.v_regex = []
-        for ss in collect_vars.values():
-            try:
-                self.v_regex.append(re.compile(genregex.Genregex(ss, pvalue=0.05).pyregex()))
-            except:  # noqa: PERF203
-                logging.error("error reading ss=%s!", ss)
-                raise
+        self.matcher = regexmatcher.MRegex(self.regex)
 
     def __call__(self, *insts):  # noqa: ANN204, ANN002
         """Instantiate the variables of the wordform.
@@ -202,16 +415,42 @@ class Form:
                 w.append(p)
         return w, self.msd
 
-    def match(self, w: str, tag: str = "", constrained: bool = True) -> bool:  # noqa: D102
-        if tag and self.msd != tag:
+    def match(  # noqa: D102
+        self,
+        w: str,
+        tag: str = "",
+        constrained: bool = True,
+        cache: Optional[MutableMapping] = None,
+    ) -> bool:
+        if tag and msd_key(self.msd) != msd_key(tag):
             return False
-        return self.match_vars(w, constrained) is not None
+        return self.match_vars(w, constrained, cache=cache) is not None
+
+    def match_vars(
+        self, w: str, constrained: bool = True, cache: Optional[MutableMapping] = None
+    ) -> Optional[list[tuple[int, Any]]]:
+        """Match w against the form and return the variable assignments.
 
-    def match_vars(self, w: str, constrained: bool = True) -> Optional[list[tuple[int, Any]]]:  # noqa: D102
-        print(f"paradigm.Form.match_vars(w={w},constrained={constrained})")  # noqa: T201
-        print(f"paradigm.Form.match_vars: self.regex = {self.regex}")  # noqa: T201
-        matcher = regexmatcher.MRegex(self.regex)
-        ms = matcher.findall(w)
+        Args:
+            w: the word
+            constrained: also require the variables to match the variable regexes
+            cache: a mapping where the results are looked up and stored. The
+                results of unconstrained matches only depend on the regex of
+                the form, so they are shared between equal forms of different
+                paradigms. The cached lists must not be modified.
+        """
+        if _tracing():
+            _trace("form.match_vars", w=w, constrained=constrained, regex=self.regex)
+        if cache is None:
+            return self._match_vars(w, constrained)
+        key = (self, w) if constrained else (self.regex, w)
+        result = cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = cache[key] = self._match_vars(w, constrained)
+        return result
+
+    def _match_vars(self, w: str, constrained: bool) -> Optional[list[tuple[int, Any]]]:
+        ms = self.matcher.findall(w)
         if ms is None:
             return None
         if not ms:
@@ -268,3 +507,213 @@ class Form:
             else:
                 ms.append(t)
         return f'{"+".join(self.form)}::{",,".join(ms)}' if ms else "+".join(self.form)
+
+
+class MatchCache(MutableMapping):
+    """A bounded cache of match results that evicts the least recently used.
+
+    Can be given as the cache of the matching functions, see
+    `Form.match_vars`.
+
+    Args:
+       maxsize:int
+            The number of results to keep, None for no limit.
+
+    Attributes:
+       hits, misses:int
+            The number of lookups that found or did not find a result.
+
+    The cache may be shared by threads, e.g. the handlers of a server, so
+    lookups and updates hold a lock.
+    """
+
+    def __init__(self, maxsize: Optional[int] = 65536) -> None:  # noqa: D107
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):  # noqa: ANN201, ANN001, D102
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __getitem__(self, key):  # noqa: ANN204, ANN001, D105
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:  # noqa: ANN001, D105
+        # Not a lookup: leaves the counters and the order alone
+        return key in self._data
+
+    def __setitem__(self, key, value) -> None:  # noqa: ANN001, D105
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.maxsize is not None and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __delitem__(self, key) -> None:  # noqa: ANN001, D105
+        with self._lock:
+            del self._data[key]
+
+    def __iter__(self):  # noqa: ANN204, D105
+        with self._lock:
+            return iter(list(self._data))
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._data)
+
+    def clear(self) -> None:
+        """Remove all results and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __repr__(self) -> str:  # noqa: D105
+        return (
+            f"MatchCache(maxsize={self.maxsize}, size={len(self)}, "
+            f"hits={self.hits}, misses={self.misses})"
+        )
+
+
+def msd_key(msd: Any) -> Any:
+    """Return msd with its lists turned into tuples, for comparing msds and as a dict key.
+
+    Ex: [['num', 'sg'], ['case', 'nom']] -> (('num', 'sg'), ('case', 'nom'))
+    """
+    if isinstance(msd, (list, tuple)):
+        return tuple(msd_key(m) for m in msd)
+    return msd
+
+
+def variable_regexes(v_insts: Sequence[list[tuple[str, Any]]]) -> list[re.Pattern]:
+    """Generalize the instances of each variable into a regex.
+
+    Args:
+        v_insts: the variable instances of a paradigm.
+
+    Returns:
+        list[re.Pattern]: a regex per variable, in order of first appearance.
+    """
+    collect_vars: dict[str, set[str]] = defaultdict(set)
+    for vs in v_insts:
+        for i, v in vs:
+            collect_vars[i].add(v)
+    return [_variable_regex(frozenset(ss)) for ss in collect_vars.values()]
+
+
+@functools.lru_cache(maxsize=8192)
+def _variable_regex(ss: frozenset[str]) -> re.Pattern:
+    """Compile the regex for a set of variable instances.
+
+    Different paradigms often have the same instances for a variable, for
+    example paradigms that only differ in their endings, so the regexes are
+    cached across paradigms.
+    """
+    try:
+        return re.compile(genregex.Genregex(sorted(ss), pvalue=0.05).pyregex())
+    except:
+        logging.error("error reading ss=%s!", ss)
+        raise
+
+
+def iter_p_file(path: str, pos: str = "", lazy: bool = False) -> Iterator[Paradigm]:
+    r"""Read the paradigms of a .p file one at a time, in the order of the file.
+
+    Each line is a paradigm as written by `str` of a `Paradigm`: its forms
+    ``form::msd`` separated by "#", a tab and its members, also separated by
+    "#". Ex:
+        1+a+2::num=sg,,case=nom#1+ä+2+er::num=pl,,case=nom\t1=st,,2=d#1=b,,2=d
+    An msd item without "=" has no type and becomes (None, item). Files
+    compressed with gzip are read directly.
+
+    The paradigms get the p_id and uuid ``p<line>_<first member>``. Equal
+    msds share one list and the variable names are interned, so that large
+    files take less memory.
+
+    Args:
+        path: the .p file, possibly gzipped
+        pos: the part of speech of the paradigms
+        lazy: compile the regexes of each paradigm when it is first used,
+            see `Paradigm`
+    """
+    msds: dict[str, list[tuple[Optional[str], str]]] = {}
+    with _open_p_file(path, "r") as fp:
+        for line_no, line in enumerate(fp, 1):
+            line = line.rstrip("\r\n")  # noqa: PLW2901
+            if not line:
+                continue
+            forms, _, members = line.partition("\t")
+            form_msds = []
+            for s in forms.split("#"):
+                form, _, m = s.partition("::")
+                if m not in msds:
+                    msds[m] = [_msd_item(x) for x in m.split(",,")] if m else []
+                form_msds.append((form, msds[m]))
+            try:
+                var_insts = [
+                    [_var_binding(b) for b in member.split(",,")]
+                    for member in members.split("#")
+                    if member
+                ]
+            except ValueError as e:
+                raise ValueError(f"{path}, line {line_no}: {e}") from e
+            p_id = f"p{line_no}_{var_insts[0][0][1]}" if var_insts else f"p{line_no}"
+            yield Paradigm(form_msds, var_insts, p_id=p_id, pos=pos, uuid=p_id, lazy=lazy)
+
+
+def load_p_file(path: str, pos: str = "", lazy: bool = False) -> list[Paradigm]:
+    """Read the paradigms of a .p file, see `iter_p_file`.
+
+    The paradigms are sorted by their number of members, most first, and get
+    the p_id and uuid ``p<rank>_<first member>``.
+    """
+    paradigms = sorted(iter_p_file(path, pos=pos, lazy=lazy), key=lambda p: -len(p.var_insts))
+    for i, p in enumerate(paradigms, 1):
+        p.p_id = p.uuid = f"p{i}_{p.var_insts[0][0][1]}" if p.var_insts else f"p{i}"
+    return paradigms
+
+
+def write_p_file(path: str, paradigms: Iterable[Paradigm]) -> None:
+    """Write paradigms to a .p file, gzipped if path ends with ".gz"."""
+    with _open_p_file(path, "w") as fp:
+        for p in paradigms:
+            fp.write(f"{p}\n")
+
+
+@contextlib.contextmanager
+def _open_p_file(path: str, mode: str) -> Iterator[IO[str]]:
+    if mode == "r":
+        with Path(path).open("rb") as fp:
+            gzipped = fp.read(2) == b"\x1f\x8b"
+    else:
+        gzipped = path.endswith(".gz")
+    if gzipped:
+        with gzip.GzipFile(path, mode + "b") as gz, io.TextIOWrapper(gz, encoding="utf-8") as fp:
+            yield fp
+    else:
+        with Path(path).open(mode, encoding="utf-8") as fp:
+            yield fp
+
+
+def _msd_item(item: str) -> tuple[Optional[str], str]:
+    t, eq, v = item.partition("=")
+    return (sys.intern(t), v) if eq else (None, item)
+
+
+def _var_binding(binding: str) -> tuple[str, str]:
+    name, eq, value = binding.partition("=")
+    if not eq:
+        raise ValueError(f"variable binding without '=': {binding!r}")
+    return sys.intern(name), value
@@ -1,56 +1,404 @@
 """Pextract."""
 
+import array
+import concurrent.futures
 import functools
 import itertools
+import logging
 import operator
 import re
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from typing import Any, Optional
 
 from paradigmextract import paradigm
 
+logger = logging.getLogger(__name__)
 
-def learnparadigms(inflectiontables: list[tuple[list[str], list[tuple[str, str]]]]):  # noqa: ANN201, D103
-    vartables = []
-    table_limit = 16
-    for table, tagtable in inflectiontables:
-        tablehead = table[0]
-        taghead = tagtable[0]
-        wg = [WordGraph.from_string(x) for x in table]
-        result = functools.reduce(operator.and_, wg)
-        lcss = result.longestwords
-        if not lcss:  # Table has no LCS - no variables
-            vartables.append((tablehead, taghead, [[table, table, table, [], 0, 0]], tagtable))
-            continue
 
-        combos = []
+def learnparadigms(
+    inflectiontables: Iterable[tuple[list[str], list[tuple[str, str]]]],
+    workers: int = 1,
+    chunksize: int = 64,
+    config: Optional["LearnerConfig"] = None,
+) -> list[paradigm.Paradigm]:
+    """Learn paradigms from a list of inflection tables.
+
+    Each table is reduced to its best variable table independently, so with
+    ``workers`` > 1 that work is done in chunks of ``chunksize`` tables by a
+    process pool. Collapsing the tables into paradigms is always done in the
+    calling process and the result is the same as for ``workers=1``.
+
+    Args:
+        inflectiontables: pairs of word forms and their tags.
+        workers: number of worker processes to use.
+        chunksize: number of tables sent to a worker at a time.
+        config: how to learn, see `LearnerConfig`. If it collects statistics,
+            they are logged.
+
+    Returns:
+        list[paradigm.Paradigm]: the learned paradigms.
+    """
+    learner = ParadigmLearner(config=config)
+    learner.add_tables(inflectiontables, workers=workers, chunksize=chunksize)
+    if learner.config.collect_stats:
+        log_stats(learner.stats)
+    return learner.paradigms()
+
+
+class ParadigmLearner:
+    """Incremental paradigm learner.
+
+    Inflection tables are added one at a time, or from any iterable, and
+    merged into an index keyed on the (variable table, tags) signature of
+    their best variable table. Only the signature and the variable instances
+    of each table are kept, so the learner can be fed from a generator and
+    queried for the paradigms at any point.
+
+    Example:
+    >>> learner = ParadigmLearner()
+    >>> tags = [("msd", "sg"), ("msd", "pl")]
+    >>> learner.add_table(["stad", "städer"], tags)
+    >>> learner.add_table(["bad", "bäder"], tags)
+    >>> [p.var_insts for p in learner.paradigms()]
+    [[[('first-attest', 'bad'), ('1', 'b'), ('2', 'd')], [('first-attest', 'stad'), ('1', 'st'), ('2', 'd')]]]
+
+    Args:
+        paradigms: already learned paradigms to add new tables to.
+        config: how to learn, see `LearnerConfig`.
+    """  # noqa: E501
+
+    def __init__(  # noqa: D107
+        self,
+        paradigms: Iterable[paradigm.Paradigm] = (),
+        config: Optional["LearnerConfig"] = None,
+    ) -> None:
+        self.config = config or LearnerConfig()
+        # Statistics for each added table, if the config collects them
+        self.stats: list[TableStats] = []
+        # signature -> (variable table, tags, variable instances in order of arrival)
+        self._index: dict[tuple, tuple[list[str], list, list[list[tuple[str, str]]]]] = {}
+        for p in paradigms:
+            self.add_paradigm(p)
+
+    def __len__(self) -> int:
+        """Return the number of paradigms learned so far."""
+        return len(self._index)
+
+    def add_table(self, table: list[str], tagtable: list) -> None:
+        """Learn one inflection table."""
+        self._add_learned(_learn_table((table, tagtable), self.config))
+
+    def add_tables(
+        self,
+        inflectiontables: Iterable[tuple[list[str], list]],
+        workers: int = 1,
+        chunksize: int = 64,
+    ) -> None:
+        """Learn inflection tables from an iterable, see `learnparadigms`."""
+        for learned in _learn_tables(inflectiontables, self.config, workers, chunksize):
+            self._add_learned(learned)
+
+    def add_paradigm(self, p: paradigm.Paradigm) -> None:
+        """Add the members of an already learned paradigm."""
+        vartable = ["+".join(f.form) for f in p.forms]
+        tags = [f.msd for f in p.forms]
+        entry = self._entry(vartable, tags)
+        # paradigms list their first member last, see `paradigms`
+        entry[2].extend(p.var_insts[-1:] + p.var_insts[:-1])
+
+    def paradigms(self) -> list[paradigm.Paradigm]:
+        """Return the paradigms learned so far.
+
+        The paradigms come in the order their first table was added and each
+        paradigm lists its members in order of arrival, except for the first
+        member, which is listed last.
+        """
+        paradigms = []
+        for vartable, tags, members in self._index.values():
+            formlist = list(zip(vartable, tags))
+            varstring = members[1:] + members[:1]
+            try:
+                p = paradigm.Paradigm(formlist, varstring)
+            except (ValueError, IndexError, re.error):
+                logger.exception("could not build paradigm %s from %s", formlist, varstring)
+                raise
+            paradigms.append(p)
+        return paradigms
+
+    def _entry(self, vartable: list[str], tags: list) -> tuple:
+        signature = (paradigm.msd_key(vartable), paradigm.msd_key(tags))
+        if signature not in self._index:
+            self._index[signature] = (vartable, tags, [])
+        return self._index[signature]
+
+    def _add_learned(self, learned: tuple[tuple, Optional["TableStats"]]) -> None:
+        filteredtable, stats = learned
+        self._add(filteredtable)
+        if stats is not None:
+            self.stats.append(stats)
+
+    def _add(self, filteredtable: tuple) -> None:
+        tablehead, _, besttable, tags = filteredtable
+        entry = self._entry(besttable[2], tags)
+        entry[2].append(_vars_to_string(tablehead, besttable[3]))
+
+
+class LearnerConfig:
+    """Settings that trade learning speed against the quality of the paradigms.
+
+    The bracketings of the LCS in the words of a table are filtered until
+    there are at most ``table_limit`` ways to combine them, and the best
+    combination is then searched for among these.
+
+    Args:
+        table_limit: the number of combinations to filter down to, None to
+            never filter.
+        filters: the filters to apply, in order, until the number of
+            combinations is within ``table_limit``. Each one takes and returns
+            a list of bracketings per word. Defaults to `DEFAULT_FILTERS`.
+        max_lcs: use only this many of the longest common subsequences of
+            each table, None to use all of them.
+        collect_stats: record `TableStats` for each learned table.
+    """
+
+    def __init__(  # noqa: D107
+        self,
+        table_limit: Optional[int] = 16,
+        filters: Optional[Sequence[Callable[[list[list[str]]], list[list[str]]]]] = None,
+        max_lcs: Optional[int] = None,
+        collect_stats: bool = False,
+    ) -> None:
+        self.table_limit = table_limit
+        self.filters = tuple(filters) if filters is not None else DEFAULT_FILTERS
+        self.max_lcs = max_lcs
+        self.collect_stats: bool = collect_stats
+
+    @classmethod
+    def fast(cls, **kwargs: Any) -> "LearnerConfig":
+        """Use one LCS per table and filter down to a single combination."""
+        options: dict[str, Any] = {"table_limit": 1, "max_lcs": 1, **kwargs}
+        return cls(**options)
+
+    @classmethod
+    def exhaustive(cls, **kwargs: Any) -> "LearnerConfig":
+        """Use all LCSs and search all combinations of bracketings."""
+        options: dict[str, Any] = {"table_limit": None, "max_lcs": None, **kwargs}
+        return cls(**options)
+
+    def __repr__(self) -> str:  # noqa: D105
+        filters = ", ".join(f.__name__ for f in self.filters)
+        return (
+            f"LearnerConfig(table_limit={self.table_limit}, filters=({filters}), "
+            f"max_lcs={self.max_lcs}, collect_stats={self.collect_stats})"
+        )
+
+
+class TableStats:
+    """Statistics for learning one inflection table.
+
+    Args:
+        form: the first form of the table.
+        words: the number of forms in the table.
+        lcss: the number of longest common subsequences used.
+        bracketings: the number of bracketings left after filtering, for all LCSs.
+        combinations: the number of combinations of these, for all LCSs.
+        seconds: the time it took to learn the table.
+    """
+
+    def __init__(  # noqa: D107
+        self,
+        form: str,
+        words: int,
+        lcss: int,
+        bracketings: int,
+        combinations: int,
+        seconds: float,
+    ) -> None:
+        self.form = form
+        self.words = words
+        self.lcss = lcss
+        self.bracketings = bracketings
+        self.combinations = combinations
+        self.seconds = seconds
+
+    def __repr__(self) -> str:  # noqa: D105
+        return (
+            f"TableStats(form={self.form!r}, words={self.words}, lcss={self.lcss}, "
+            f"bracketings={self.bracketings}, combinations={self.combinations}, "
+            f"seconds={self.seconds:.6f})"
+        )
+
+
+def log_stats(stats: Sequence[TableStats], slowest: int = 10) -> None:
+    """Log a summary of learning statistics and the slowest tables."""
+    if not stats:
+        return
+    total = sum(s.seconds for s in stats)
+    logger.info(
+        "learned %d tables in %.3fs (%.3f ms/table), %d bracketings, %d combinations",
+        len(stats),
+        total,
+        1000 * total / len(stats),
+        sum(s.bracketings for s in stats),
+        sum(s.combinations for s in stats),
+    )
+    for s in sorted(stats, key=operator.attrgetter("seconds"), reverse=True)[:slowest]:
+        logger.info("%s", s)
+
+
+def _learn_tables(
+    inflectiontables: Iterable[tuple[list[str], list]],
+    config: LearnerConfig,
+    workers: int,
+    chunksize: int,
+) -> Iterator[tuple[tuple, Optional[TableStats]]]:
+    """Yield the best variable table of each inflection table, in order.
+
+    The input is consumed lazily, a pool of ``workers`` processes gets at most a
+    few chunks per worker at a time.
+    """
+    learn = functools.partial(_learn_table, config=config)
+    if workers <= 1:
+        yield from map(learn, inflectiontables)
+        return
+    tables = iter(inflectiontables)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        while batch := list(itertools.islice(tables, 4 * workers * chunksize)):
+            yield from executor.map(learn, batch, chunksize=chunksize)
+
+
+def _learn_table(
+    inflectiontable: tuple[list[str], list[tuple[str, str]]], config: LearnerConfig
+) -> tuple[tuple, Optional[TableStats]]:
+    """Find the best variable table for one inflection table."""
+    start = time.perf_counter()
+    table, tagtable = inflectiontable
+    tablehead = table[0]
+    taghead = tagtable[0]
+    lcss = longest_common_subsequences(table)[: config.max_lcs]
+    if not lcss:  # Table has no LCS - no variables
+        besttable = [table, table, table, [], 0, 0]
+        numbracketings = numcombinations = 0
+    else:
+        best: Optional[tuple[tuple[int, int], str, tuple[str, ...]]] = None
+        numbracketings = numcombinations = 0
         for lcs in lcss:
-            factorlist = [_findfactors(w, lcs) for w in table]
-            factorlist = _filterbracketings(
-                factorlist,
-                (
-                    _ffilter_lcp,
-                    _ffilter_shortest_string,
-                    _ffilter_shortest_infix,
-                    _ffilter_longest_single_var,
-                    _ffilter_leftmost_sum,
-                ),
-                table_limit,
-            )
-            combinations = itertools.product(*factorlist)
-            for c in combinations:
-                (numvars, variablelist) = _evalfact(lcs, c)
-                infixcount = functools.reduce(lambda x, y: x + _count_infix_segments(y), c, 0)
-                variabletable = [_string_to_varstring(s, variablelist) for s in c]
-                combos.append([table, c, variabletable, variablelist, numvars, infixcount])
+            factorlist = _filtered_bracketings(table, lcs, config.table_limit, config.filters)
+            numbracketings += sum(len(f) for f in factorlist)
+            numcombinations += _numcombinations(len(f) for f in factorlist)
+            found = _best_combination(lcs, factorlist, best[0] if best else None)
+            if found is not None:
+                best = (found[0], lcs, found[1])
+        if best is None:
+            raise ValueError(f"No placement of the LCS fits all words in {table}")
+
+        _, lcs, c = best
+        (numvars, variablelist) = _evalfact(lcs, c)
+        infixcount = sum(_count_infix_segments(x) for x in c)
+        variabletable = [_string_to_varstring(s, variablelist) for s in c]
+        besttable = [table, c, variabletable, variablelist, numvars, infixcount]
+
+    stats = None
+    if config.collect_stats:
+        seconds = time.perf_counter() - start
+        stats = TableStats(
+            tablehead, len(table), len(lcss), numbracketings, numcombinations, seconds
+        )
+        logger.debug("%s", stats)
+    return (tablehead, taghead, besttable, tagtable), stats
+
+
+def longest_common_subsequences(table: Sequence[str]) -> list[str]:
+    """Find all longest common subsequences of a list of strings.
+
+    Every word is turned into an array of next-occurrence positions over the
+    symbols that occur in all words, and the product of these automata is
+    searched depth first from the start state with the longest remaining path
+    memoized per state. This gives the same strings as intersecting
+    `WordGraph`s, without building the intersected automata.
+
+    >>> longest_common_subsequences(["stad", "städer", "stads"])
+    ['std']
+    >>> longest_common_subsequences(["xy", "z"])
+    []
 
-        vartables.append((tablehead, taghead, combos, tagtable))
+    Args:
+        table: the words.
 
-    filteredtables = []
+    Returns:
+        list[str]: the longest common subsequences, sorted.
+    """
+    if not table:
+        return []
+    symbols = sorted(set(table[0]).intersection(*table[1:]))
+    if not symbols:
+        return []
+    numsymbols = len(symbols)
+    # Shortest words first, they are the most likely to have no next occurrence.
+    order = sorted(range(len(table)), key=lambda k: len(table[k]))
+    nexts = [_next_positions(table[k], symbols) for k in order]
+
+    start = (0,) * len(table)
+    successors: dict[tuple[int, ...], list[tuple[int, tuple[int, ...]]]] = {}
+    longest: dict[tuple[int, ...], int] = {}
+    stack = [start]
+    while stack:
+        state = stack[-1]
+        if state in longest:
+            stack.pop()
+            continue
+        if state not in successors:
+            succ = []
+            for sym in range(numsymbols):
+                target = []
+                for nextpos, pos in zip(nexts, state):
+                    nxt = nextpos[pos * numsymbols + sym]
+                    if nxt < 0:
+                        break
+                    target.append(nxt)
+                else:
+                    succ.append((sym, tuple(target)))
+            successors[state] = succ
+        pending = [target for _, target in successors[state] if target not in longest]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        longest[state] = max((longest[target] + 1 for _, target in successors[state]), default=0)
+
+    if longest[start] == 0:
+        return []
+    lcss = []
+    paths = [(start, "")]
+    while paths:
+        state, prefix = paths.pop()
+        if longest[state] == 0:
+            lcss.append(prefix)
+            continue
+        paths.extend(
+            (target, prefix + symbols[sym])
+            for sym, target in successors[state]
+            if longest[target] == longest[state] - 1
+        )
+    return sorted(lcss)
 
-    for idform, idtag, t, tags in vartables:
-        besttable = min(t, key=operator.itemgetter(4, 5))
-        filteredtables.append((idform, idtag, besttable, tags))
 
-    return _collapse_tables(filteredtables)
+def _next_positions(word: str, symbols: Sequence[str]) -> array.array:
+    """Compute the subsequence automaton of a word as a flat array.
+
+    Entry ``i * len(symbols) + s`` is one past the first position ``>= i`` of
+    ``symbols[s]`` in the word, or -1 if there is none.
+    """
+    numsymbols = len(symbols)
+    symbolid = {sym: idx for idx, sym in enumerate(symbols)}
+    nexts = array.array("i", [-1]) * ((len(word) + 1) * numsymbols)
+    for i in range(len(word) - 1, -1, -1):
+        row = i * numsymbols
+        nexts[row : row + numsymbols] = nexts[row + numsymbols : row + 2 * numsymbols]
+        if word[i] in symbolid:
+            nexts[row + symbolid[word[i]]] = i + 1
+    return nexts
 
 
 class WordGraph:
@@ -280,42 +628,240 @@ def _evalfact(lcs, c):  # noqa: ANN001, ANN202
     return numvars, variables
 
 
+def _best_combination(
+    lcs: str, factorlist: list[list[str]], bound: Optional[tuple[int, int]] = None
+) -> Optional[tuple[tuple[int, int], tuple[str, ...]]]:
+    """Find the combination of bracketings with the fewest variables and infixes.
+
+    Searches the combinations in the order of ``itertools.product(*factorlist)``
+    and returns the first one with the smallest (number of variables, number
+    of infix segments), as given by `_evalfact` and `_count_infix_segments`.
+    A partial combination is dropped as soon as the variables it already
+    needs and the fewest infixes the remaining words can add make it no
+    better than the best one so far.
+
+    Args:
+        lcs: the LCS placed in the bracketings.
+        factorlist: the bracketings of each word.
+        bound: only look for combinations better than this.
+
+    Returns:
+        the (number of variables, number of infixes) and the combination, or
+        None if no combination is better than bound.
+    """
+    breaks = [[_variable_ends(x, len(lcs)) for x in f] for f in factorlist]
+    infixes = [[_count_infix_segments(x) for x in f] for f in factorlist]
+    # fewest infixes the words from i and on can add
+    restinfix = [0] * (len(factorlist) + 1)
+    for i in range(len(factorlist) - 1, -1, -1):
+        restinfix[i] = restinfix[i + 1] + min(infixes[i], default=0)
+
+    best = None
+    stack: list[tuple[int, int, int, tuple[str, ...]]] = [(0, 0, 0, ())]
+    while stack:
+        i, ends, infix, chosen = stack.pop()
+        key = (bin(ends).count("1"), infix + restinfix[i])
+        if bound is not None and key >= bound:
+            continue
+        if i == len(factorlist):
+            best = (key, chosen)
+            bound = key
+            continue
+        stack.extend(
+            (i + 1, ends | breaks[i][j], infix + infixes[i][j], (*chosen, factorlist[i][j]))
+            for j in range(len(factorlist[i]) - 1, -1, -1)
+        )
+    return best
+
+
+def _variable_ends(bracketing: str, lcslen: int) -> int:
+    """Return the positions in the LCS where a variable ends, as a bit mask.
+
+    This is the per-word part of `_evalfact`.
+    """
+    ends = 0
+    p = 0
+    inside = False
+    for pos in bracketing:
+        if pos == "[":
+            inside = True
+        elif pos == "]":
+            inside = False
+            ends |= 1 << ((p - 1) % lcslen)
+        elif inside:
+            p += 1
+    return ends
+
+
 def _findfactors(word, lcs):  # noqa: ANN202, ANN001
-    """Recursively finds the different ways to place an LCS in a string."""
-    word = list(word)
-    lcs = list(lcs)
-    factors = []
+    """Find the different ways to place an LCS in a string."""
+    return _bracketings(word, lcs)
+
+
+def _count_bracketings(word: str, lcs: str) -> int:
+    """Count the ways to place an LCS in a string, without listing them."""
+    ways = [1] + [0] * len(lcs)
+    for c in word:
+        for j in range(len(lcs), 0, -1):
+            if lcs[j - 1] == c:
+                ways[j] += ways[j - 1]
+    return ways[-1]
 
-    def rec(word, lcs, posw, posl, inmatch, tempstring) -> None:  # noqa: ANN001
-        if posw == len(word) and posl != len(lcs):
-            return
-        if posw != len(word) and posl == len(lcs):
-            if inmatch:
-                rec(word, lcs, posw + 1, posl, 0, [*tempstring, "]", word[posw]])
-            else:
-                rec(word, lcs, posw + 1, posl, 0, [*tempstring, word[posw]])
-            return
 
-        if posw == len(word) and posl == len(lcs):
+def _bracketings(
+    word: str, lcs: str, prefix: Optional[str] = None, criteria: Sequence[str] = ()
+) -> list[str]:
+    """Enumerate the ways to place an LCS in a string, keeping only the best ones.
+
+    See `_limited_bracketings`, this never gives up.
+    """
+    factors = _limited_bracketings(word, lcs, prefix, criteria, None)
+    return factors if factors is not None else []
+
+
+def _limited_bracketings(
+    word: str,
+    lcs: str,
+    prefix: Optional[str],
+    criteria: Sequence[str],
+    limit: Optional[int],
+) -> Optional[list[str]]:
+    """Enumerate the ways to place an LCS in a string, keeping only the best ones.
+
+    The bracketings come in the order `_findfactors` has always listed them.
+    With ``prefix``, only bracketings that `_ffilter_lcp` keeps for that prefix
+    are listed, and with ``criteria`` only those that are best according to
+    the criteria in `_CRITERIA`, compared in order. Partial bracketings
+    that can only end up worse than the best one found so far are dropped as
+    soon as that is known, instead of being listed and filtered afterwards.
+
+    Args:
+        word: the string.
+        lcs: the LCS to place in word.
+        prefix: the longest common prefix of the table.
+        criteria: names of criteria in `_CRITERIA`.
+        limit: give up and return None if there are more bracketings than this.
+    """
+    n = len(word)
+    m = len(lcs)
+    keyfuncs = [_CRITERIA[c] for c in criteria]
+    # The bounds assume that brackets and @ only occur as added by us.
+    bounded = bool(criteria) and not any(c in word for c in "[]@")
+    prefixlen = len(prefix) if prefix is not None else 0
+
+    def bound(state: tuple) -> tuple:
+        posw, posl, inmatch, out, infix, pending, maxvar, curvar, leftsum = state
+        more = not inmatch and posl < m  # at least one more group will be opened
+        bounds = {
+            "length": len(out) + n - posw + (1 if inmatch else 2 if more else 0),
+            "infix": infix + (pending if more else 0),
+            "longest_variable": -max(maxvar, curvar + m - posl if inmatch else m - posl),
+            "leftmost": leftsum + (len(out) if more else 0),
+        }
+        return tuple(bounds[c] for c in criteria)
+
+    factors: list[str] = []
+    best: Optional[tuple] = None
+    stack = [(0, 0, False, "", 0, 0, 0, 0, 0)]
+    while stack:
+        state = stack.pop()
+        posw, posl, inmatch, out, infix, pending, maxvar, curvar, leftsum = state
+        if posl == m:
+            factor = out + ("]" if inmatch else "") + word[posw:]
+            if prefix is not None and factor[1 : 1 + prefixlen] != prefix:
+                continue
+            key = tuple(f(factor) for f in keyfuncs)
+            if best is None or key < best:
+                best = key
+                factors = [factor]
+            elif key == best:
+                factors.append(factor)
+            if limit is not None and len(factors) > limit:
+                return None
+            continue
+
+        children = []
+        if n - posw > m - posl:  # leave word[posw] outside the LCS
             if inmatch:
-                factors.append("".join([*tempstring, "]"]))
+                out_, pending_, maxvar_ = f"{out}]{word[posw]}", 1, max(maxvar, curvar)
             else:
-                factors.append("".join(tempstring))
-            return
-
-        if word[posw] == lcs[posl]:
+                out_, pending_, maxvar_ = out + word[posw], pending + 1 if maxvar else 0, maxvar
+            children.append((posw + 1, posl, False, out_, infix, pending_, maxvar_, 0, leftsum))
+        if word[posw] == lcs[posl]:  # match word[posw], listed before the above
             if inmatch:
-                rec(word, lcs, posw + 1, posl + 1, 1, [*tempstring, word[posw]])
+                out_, infix_, curvar_, leftsum_ = out + word[posw], infix, curvar + 1, leftsum
             else:
-                rec(word, lcs, posw + 1, posl + 1, 1, [*tempstring, "[", word[posw]])
+                out_, curvar_ = f"{out}[{word[posw]}", 1
+                infix_, leftsum_ = infix + pending, leftsum + len(out)
+            children.append(
+                (posw + 1, posl + 1, True, out_, infix_, 0, maxvar, curvar_, leftsum_)
+            )
+        for child in children:
+            if prefix is not None and len(out) <= prefixlen:
+                head = child[3][1 : 1 + prefixlen]
+                if head != prefix[: len(head)]:
+                    continue
+            if bounded and best is not None and bound(child) > best:
+                continue
+            stack.append(child)
+    return factors
+
+
+def _filtered_bracketings(
+    table: Sequence[str],
+    lcs: str,
+    tablecap: Optional[int],
+    filters: Optional[Sequence[Callable]] = None,
+) -> list[list[str]]:
+    """Find the bracketings of the LCS in all words of a table and filter them.
+
+    Gives the same result as `_filterbracketings` applied to `_findfactors`
+    for each word. For the filters in this module, in any order as long as
+    `_ffilter_lcp` comes first, the filters are applied while the bracketings
+    are enumerated. Other filters are applied afterwards.
 
-        if inmatch:
-            rec(word, lcs, posw + 1, posl, 0, [*tempstring, "]", word[posw]])
+    Args:
+        table: the words.
+        lcs: the LCS to place in the words.
+        tablecap: filter until there are at most this many combinations, None
+            to not filter.
+        filters: the filters, defaults to `DEFAULT_FILTERS`.
+    """
+    if filters is None:
+        filters = DEFAULT_FILTERS
+    if tablecap is None or not filters:
+        return [_bracketings(w, lcs) for w in table]
+    haslcp = filters[0] is _ffilter_lcp
+    if not all(f in _FILTER_CRITERIA for f in filters[haslcp:]):
+        return _filterbracketings([_findfactors(w, lcs) for w in table], filters, tablecap)
+    if _numcombinations(_count_bracketings(w, lcs) for w in table) <= tablecap:
+        return [_bracketings(w, lcs) for w in table]
+    # Every word has a bracketing here, so the prefix of all bracketings is
+    # the prefix of the words.
+    prefix = _lcp(table) if haslcp else None
+    criteria = [_FILTER_CRITERIA[f] for f in filters[haslcp:]]
+    for depth in range(not haslcp, len(criteria) + 1):
+        if depth == 0 < len(criteria):
+            # Only the LCP filter stage can be cut short, and not if it is the last.
+            limited = [_limited_bracketings(w, lcs, prefix, (), tablecap) for w in table]
+            # More than tablecap combinations, unless a word has none at all.
+            if None in limited and [] not in limited:
+                continue
+            factorlist = [
+                f if f is not None else _bracketings(w, lcs, prefix)
+                for f, w in zip(limited, table)
+            ]
         else:
-            rec(word, lcs, posw + 1, posl, 0, [*tempstring, word[posw]])
+            factorlist = [_bracketings(w, lcs, prefix, criteria[:depth]) for w in table]
+        if depth == len(criteria):
+            break
+        if _numcombinations(len(f) for f in factorlist) <= tablecap:
+            break
+    return factorlist
+
 
-    rec(word, lcs, 0, 0, 0, [])
-    return factors.copy()
+def _numcombinations(sizes: Iterable[int]) -> int:
+    return functools.reduce(operator.mul, sizes, 1)
 
 
 def _vars_to_string(baseform, varlist):  # noqa: ANN202, ANN001
@@ -326,34 +872,16 @@ def _vars_to_string(baseform, varlist):  # noqa: ANN202, ANN001
 def _collapse_tables(tables):  # noqa: ANN202, ANN001
     """Collapse tables.
 
+    Tables with the same variable table and the same tags are grouped on that
+    signature, the paradigms come in the order of the first table of each group.
+
     Input: list of tables
     Output: Collapsed paradigms.
     """
-    paradigms = []
-    collapsedidx = set()  # Store indices to collapsed tables
-    for idx, tab in enumerate(tables):
-        tags = tab[3]
-        t = tab[2]
-        if idx in collapsedidx:
-            continue
-        varstring = []
-        vartable = t[2]
-        # Find similar tables
-        for idx2, tab2 in enumerate(tables):
-            t2 = tab2[2]
-            if idx2 != idx and vartable == t2[2] and tags == tab2[3]:
-                varstring.append(_vars_to_string(tab2[0], t2[3]))
-                collapsedidx.update({idx2})
-        varstring.append(_vars_to_string(tab[0], t[3]))
-        formlist = zip(t[2], tags)
-        try:
-            p = paradigm.Paradigm(formlist, varstring)
-        except:
-            print(formlist)  # noqa: T201
-            print(varstring)  # noqa: T201
-            raise
-        paradigms.append(p)
-    return paradigms
+    learner = ParadigmLearner()
+    for tab in tables:
+        learner._add(tab)
+    return learner.paradigms()
 
 
 def _ffilter_lcp(factorlist):  # noqa: ANN202, ANN001
@@ -403,6 +931,30 @@ def _ffilter_leftmost_sum(factorlist):  # noqa: ANN202, ANN001
     ]
 
 
+# Criteria of the filters above, as keys that are smaller for better bracketings.
+_CRITERIA = {
+    "length": len,
+    "infix": _count_infix_segments,
+    "longest_variable": lambda x: -_longest_variable(x),
+    "leftmost": lambda x: sum(i for i in range(len(x)) if x.startswith("[", i)),
+}
+
+_FILTER_CRITERIA = {
+    _ffilter_shortest_string: "length",
+    _ffilter_shortest_infix: "infix",
+    _ffilter_longest_single_var: "longest_variable",
+    _ffilter_leftmost_sum: "leftmost",
+}
+
+DEFAULT_FILTERS = (
+    _ffilter_lcp,
+    _ffilter_shortest_string,
+    _ffilter_shortest_infix,
+    _ffilter_longest_single_var,
+    _ffilter_leftmost_sum,
+)
+
+
 def _filterbracketings(factorlist, functionlist, tablecap):  # noqa: ANN202, ANN001
     def numcombinations(f):  # noqa: ANN202, ANN001
         return functools.reduce(lambda x, y: x * len(y), f, 1)
@@ -10,6 +10,11 @@ class MRegex:
     Expressions are automatically anchored in the head and the tail,
     i.e. the regexes behave as if they began with ^ and ended with $.
 
+    The regex is split once into the literal strings between the (.+)
+    groups. Matching checks the first and last literal with startswith and
+    endswith and then finds every placement of the literals in between with
+    str.find, without recursion.
+
     Example usage:
     >>> from paradigmextract.regexmatcher import MRegex
     >>> m = MRegex('(.+)a(.+)as')
@@ -19,40 +24,53 @@ class MRegex:
 
     def __init__(self, regex: str) -> None:  # noqa: D107
         self.regex = regex
-        self.regexlen = len(regex)
-        self.text = ""
-        self.textlen = 0
-        # self.matches: list = []
-        self.results: list[list[tuple[int, int]]] = []
-        self.matched = False
-
-    def findall(self, text: str) -> Optional[list[tuple[str, ...]]]:  # noqa: D102
-        strindex = 0
-        regindex = 0
-        self.text = text
-        self.textlen = len(text)
-        self.results = []
-        self.matched = False
-        self.match(strindex, regindex, [])
-        if self.matched:
-            return [tuple(self.text[i:j] for i, j in r) for r in self.results]
-        return None
-
-    def match(self, strindex: int, regindex: int, groups: list[tuple[int, int]]) -> None:  # noqa: D102
-        # Are we at end of regex _1and_ text?
-        if strindex == self.textlen and regindex == self.regexlen:
-            self.matched = True
-            if groups:
-                self.results.append(groups)
-            return
-        # Jump out if only regex or text is consumed
-        if strindex == self.textlen or regindex == self.regexlen:
-            return
-        # Match (.+)-construct
-        if self.regex[regindex : regindex + 4] == "(.+)":
-            for i in range(strindex + 1, self.textlen + 1):
-                self.match(i, regindex + 4, [*groups, (strindex, i)])
-        # Normal match (one character)
-        elif self.text[strindex] == self.regex[regindex]:
-            self.match(strindex + 1, regindex + 1, groups)
-        return
+        # literals[0] (.+) literals[1] ... (.+) literals[-1]
+        self.literals = regex.split("(.+)")
+        self.numgroups = len(self.literals) - 1
+        self.minlen = sum(len(lit) for lit in self.literals) + self.numgroups
+        # minlen_from[k]: shortest text that group k and everything after it up
+        # to the last literal can match
+        self.minlen_from = [
+            self.numgroups - k + sum(len(lit) for lit in self.literals[k + 1 : -1])
+            for k in range(self.numgroups)
+        ]
+
+    def findall(self, text: str) -> Optional[list[tuple[str, ...]]]:
+        """Find all matches of the regex in text.
+
+        Returns:
+            the groups of each match, ordered by where the groups end, [] if
+            the regex has no groups and matches, and None if it does not match.
+        """
+        literals = self.literals
+        if self.numgroups == 0:
+            return [] if text == literals[0] else None
+        if (
+            len(text) < self.minlen
+            or not text.startswith(literals[0])
+            or not text.endswith(literals[-1])
+        ):
+            return None
+        end = len(text) - len(literals[-1])
+        last = self.numgroups - 1
+        results = []
+        stack: list[tuple[int, int, tuple[str, ...]]] = [(0, len(literals[0]), ())]
+        while stack:
+            group, start, groups = stack.pop()
+            if group == last:
+                results.append((*groups, text[start:end]))
+                continue
+            literal = literals[group + 1]
+            # The literal can start after at least one character of this group,
+            # and must leave room for the rest.
+            stop = end - self.minlen_from[group + 1]
+            positions = []
+            pos = text.find(literal, start + 1, stop)
+            while pos != -1:
+                positions.append(pos)
+                pos = text.find(literal, pos + 1, stop)
+            stack.extend(
+                (group + 1, pos + len(literal), (*groups, text[start:pos]))
+                for pos in reversed(positions)
+            )
+        return results or None
@@ -0,0 +1,11 @@
+import functools
+import operator
+
+from paradigmextract.pextract import WordGraph, longest_common_subsequences
+
+
+def test_all(test_tables: list[dict[str, list[str]]]):
+    for table in test_tables:
+        wg = [WordGraph.from_string(x) for x in table["wordforms"]]
+        expected = functools.reduce(operator.and_, wg).longestwords
+        assert longest_common_subsequences(table["wordforms"]) == sorted(expected)
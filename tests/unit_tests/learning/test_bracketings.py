@@ -0,0 +1,60 @@
+import pytest
+
+from paradigmextract.pextract import (
+    _best_combination,
+    _count_bracketings,
+    _ffilter_lcp,
+    _ffilter_leftmost_sum,
+    _ffilter_longest_single_var,
+    _ffilter_shortest_infix,
+    _ffilter_shortest_string,
+    _filterbracketings,
+    _filtered_bracketings,
+    _findfactors,
+    longest_common_subsequences,
+)
+
+FILTERS = (
+    _ffilter_lcp,
+    _ffilter_shortest_string,
+    _ffilter_shortest_infix,
+    _ffilter_longest_single_var,
+    _ffilter_leftmost_sum,
+)
+
+
+def test_findfactors():
+    assert _findfactors("stads", "std") == ["[st]a[d]s"]
+    assert _findfactors("abab", "ab") == ["[ab]ab", "[a]ba[b]", "ab[ab]"]
+
+
+def test_count_bracketings():
+    assert _count_bracketings("bananas", "ana") == len(_findfactors("bananas", "ana"))
+    assert _count_bracketings("xyz", "a") == 0
+
+
+@pytest.mark.parametrize(
+    "table",
+    [
+        ["stad", "städer", "stads"],
+        ["bananas", "ananas", "bananananas"],
+        ["sopar bort", "sopas bort", "bortsopad", "sopade bort", "bortsopade"],
+        ["gytter", "gytters", "gyttret", "gyttrets", "gytter-"],
+        ["abab", "baba", "aabb"],
+    ],
+)
+@pytest.mark.parametrize("tablecap", [1, 4, 16])
+def test_same_as_filter_chain(table, tablecap):
+    for lcs in longest_common_subsequences(table):
+        factorlist = [_findfactors(w, lcs) for w in table]
+        expected = _filterbracketings(factorlist, FILTERS, tablecap)
+        assert _filtered_bracketings(table, lcs, tablecap) == expected
+
+
+def test_best_combination():
+    factorlist = [["[st]a[d]"], ["[st]ä[d]er"], ["[st]a[d]s", "[s]ta[d]s"]]
+    assert _best_combination("std", factorlist) == (
+        (2, 3),
+        ("[st]a[d]", "[st]ä[d]er", "[st]a[d]s"),
+    )
+    assert _best_combination("std", factorlist, bound=(2, 3)) is None
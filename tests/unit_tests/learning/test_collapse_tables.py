@@ -1367,3 +1367,31 @@ def test_transient2():
     ]
     paradigmlist = _collapse_tables(filtered_tables)
     assert len(paradigmlist) == 2
+
+
+def test_order_is_kept():
+    tags = [("msd", "sg indef nom"), ("msd", "pl indef nom")]
+
+    def entry(idform, variable_table, variablelist) -> tuple:
+        return (idform, tags[0], [[], (), variable_table, variablelist, 1, 0], tags)
+
+    filtered_tables = [
+        entry("bil", ["1", "1+ar"], ["bil"]),
+        entry("hus", ["1", "1"], ["hus"]),
+        entry("bok", ["1", "1+ar"], ["bok"]),
+        entry("bord", ["1", "1"], ["bord"]),
+        entry("stol", ["1", "1+ar"], ["stol"]),
+    ]
+
+    paradigmlist = _collapse_tables(filtered_tables)
+    assert [p.var_insts for p in paradigmlist] == [
+        [
+            [("first-attest", "bok"), ("1", "bok")],
+            [("first-attest", "stol"), ("1", "stol")],
+            [("first-attest", "bil"), ("1", "bil")],
+        ],
+        [
+            [("first-attest", "bord"), ("1", "bord")],
+            [("first-attest", "hus"), ("1", "hus")],
+        ],
+    ]
@@ -0,0 +1,49 @@
+import functools
+import operator
+
+import pytest
+
+from paradigmextract.pextract import WordGraph, longest_common_subsequences
+
+
+def test1():
+    table = ["stad", "städer", "stads"]
+    lcs = longest_common_subsequences(table)
+    assert lcs == ["std"]
+
+
+def test_no_vars():
+    table = ["xy", "z", "a"]
+    lcs = longest_common_subsequences(table)
+    assert lcs == []
+
+
+def test_empty_word():
+    assert longest_common_subsequences(["apa", ""]) == []
+
+
+def test_svalt():
+    table = [
+        "svälter ihjäl",
+        "svältes ihjäl",
+        "svälts ihjäl",
+        "ihjälsvält",
+        "svältande ihjäl",
+        "ihjälsvälts",
+    ]
+    lcs = longest_common_subsequences(table)
+    assert lcs == ["ihjäl", "svält"]
+
+
+@pytest.mark.parametrize(
+    "table",
+    [
+        ["gytter", "gytters", "gyttret", "gyttrets", "gytter-"],
+        ["bananas", "ananas", "bananananas"],
+        ["abcab", "bacba", "cabca"],
+    ],
+)
+def test_same_as_wordgraph(table):
+    wg = [WordGraph.from_string(x) for x in table]
+    expected = functools.reduce(operator.and_, wg).longestwords
+    assert longest_common_subsequences(table) == sorted(expected)
@@ -26,3 +26,20 @@ def test3():
 
     new_paradigms = learnparadigms([(table1, tags), (table2, tags), (table3, tags)])
     assert len(new_paradigms) == 2
+
+
+def test_workers_gives_same_paradigms_as_serial():
+    tags = [("msd", "sg indef nom"), ("msd", "pl indef nom"), ("msd", "sg indef gen")]
+    tables = [
+        (["stad", "städer", "stads"], tags),
+        (["bad", "bäder", "bads"], tags),
+        (["bord", "bord", "bords"], tags),
+        (["hand", "händer", "hands"], tags),
+    ]
+
+    serial = learnparadigms(tables)
+    parallel = learnparadigms(tables, workers=2, chunksize=1)
+    assert [p.var_insts for p in parallel] == [p.var_insts for p in serial]
+    assert [[f.form for f in p.forms] for p in parallel] == [
+        [f.form for f in p.forms] for p in serial
+    ]
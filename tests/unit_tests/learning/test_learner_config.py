@@ -0,0 +1,73 @@
+import importlib.util
+from pathlib import Path
+from types import ModuleType
+
+from paradigmextract.pextract import (
+    DEFAULT_FILTERS,
+    LearnerConfig,
+    ParadigmLearner,
+    _ffilter_lcp,
+    _ffilter_leftmost_sum,
+    learnparadigms,
+)
+
+TAGS = [("msd", "sg indef nom"), ("msd", "pl indef nom"), ("msd", "sg indef gen")]
+TABLES = [
+    (["stad", "städer", "stads"], TAGS),
+    (["bad", "bäder", "bads"], TAGS),
+    (["bord", "bord", "bords"], TAGS),
+]
+
+
+def test_default_config():
+    config = LearnerConfig()
+    assert config.table_limit == 16
+    assert config.filters == DEFAULT_FILTERS
+    assert config.max_lcs is None
+
+
+def test_profiles():
+    for config in (LearnerConfig.fast(), LearnerConfig.exhaustive()):
+        new_paradigms = learnparadigms(TABLES, config=config)
+        assert len(new_paradigms) == 2
+    assert LearnerConfig.fast(max_lcs=2).max_lcs == 2
+
+
+def test_custom_filters():
+    config = LearnerConfig(table_limit=1, filters=(_ffilter_lcp, _ffilter_leftmost_sum))
+    new_paradigms = learnparadigms(TABLES, config=config)
+    assert len(new_paradigms) == 2
+
+
+def test_collect_stats():
+    learner = ParadigmLearner(config=LearnerConfig(collect_stats=True))
+    learner.add_tables(TABLES)
+    assert [s.form for s in learner.stats] == ["stad", "bad", "bord"]
+    assert all(s.lcss == 1 and s.seconds >= 0 for s in learner.stats)
+    assert learner.stats[0].combinations == 1
+
+
+def test_no_stats_by_default():
+    learner = ParadigmLearner()
+    learner.add_tables(TABLES)
+    assert learner.stats == []
+
+
+def _load_pextract_script() -> ModuleType:
+    path = Path(__file__).parents[3] / "bin" / "pextract.py"
+    spec = importlib.util.spec_from_file_location("pextract_script", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_script_long_options():
+    script = _load_pextract_script()
+    config, workers = script.parse_options(
+        ["pextract.py", "--profile", "fast", "--jobs=2", "--stats"]
+    )
+    assert (config.table_limit, config.max_lcs, config.collect_stats) == (1, 1, True)
+    assert workers == 2
+    config, workers = script.parse_options(["pextract.py", "-p", "exhaustive"])
+    assert config.table_limit is None
+    assert workers == 1
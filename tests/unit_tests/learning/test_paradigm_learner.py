@@ -0,0 +1,37 @@
+from paradigmextract.pextract import ParadigmLearner, learnparadigms
+
+TAGS = [[("msd", "sg indef nom")], [("msd", "pl indef nom")], [("msd", "sg indef gen")]]
+TABLES = [
+    (["stad", "städer", "stads"], TAGS),
+    (["bord", "bord", "bords"], TAGS),
+    (["bad", "bäder", "bads"], TAGS),
+    (["hand", "händer", "hands"], TAGS),
+]
+
+
+def test_incremental_equals_batch():
+    learner = ParadigmLearner()
+    learner.add_tables(table for table in TABLES)
+
+    expected = learnparadigms(TABLES)
+    assert len(learner) == 2
+    assert [str(p) for p in learner.paradigms()] == [str(p) for p in expected]
+
+
+def test_query_between_tables():
+    learner = ParadigmLearner()
+    learner.add_table(*TABLES[0])
+    assert len(learner.paradigms()) == 1
+    assert learner.paradigms()[0].count == 1
+
+    learner.add_table(*TABLES[2])
+    assert len(learner.paradigms()) == 1
+    assert learner.paradigms()[0].count == 2
+
+
+def test_add_to_existing_paradigms():
+    learner = ParadigmLearner(learnparadigms(TABLES[:2]))
+    learner.add_tables(TABLES[2:])
+
+    expected = learnparadigms(TABLES)
+    assert [p.var_insts for p in learner.paradigms()] == [p.var_insts for p in expected]
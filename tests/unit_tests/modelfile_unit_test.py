@@ -0,0 +1,81 @@
+from paradigmextract import modelfile, morphparser, paradigm
+
+
+def _paradigms() -> list[paradigm.Paradigm]:
+    return [
+        paradigm.Paradigm(
+            form_msds=[
+                ("1+a+2", [("num", "sg")]),
+                ("1+ä+2+er", [("num", "pl")]),
+            ],
+            var_insts=[
+                [("first-attest", "stad"), ("1", "st"), ("2", "d")],
+                [("first-attest", "land"), ("1", "l"), ("2", "nd")],
+            ],
+            uuid="stad",
+        ),
+        paradigm.Paradigm(
+            form_msds=[("1", [("num", "sg")]), ("1+ar", [("num", "pl")])],
+            var_insts=[[("first-attest", "bil"), ("1", "bil")]],
+            p_id="bil",
+            pos="nn",
+            uuid="bil",
+        ),
+        paradigm.Paradigm(
+            form_msds=[("man", [(None, "sg")]), ("män", [(None, "pl")])],
+            var_insts=[[("first-attest", "man")]],
+            uuid="man",
+        ),
+    ]
+
+
+def test_write_and_load_model(tmp_path):
+    path = str(tmp_path / "model.bin")
+    paras, numexamples, lms, alphabet = morphparser.build(_paradigms(), 3, 0.01)
+    modelfile.write_model(path, paras, numexamples, lms, alphabet)
+    assert modelfile.is_model_file(path)
+
+    lparas, lnumexamples, llms, lalphabet, lindex = modelfile.load_model(path)
+    assert (lnumexamples, lalphabet) == (numexamples, alphabet)
+    assert [str(p) for p in lparas] == [str(p) for p in paras]
+    assert [(p.p_id, p.pos, p.uuid) for p in lparas] == [(p.p_id, p.pos, p.uuid) for p in paras]
+    assert [r.pattern for r in lparas[0].v_regex] == [r.pattern for r in paras[0].v_regex]
+    assert [p.var_insts for p in lparas] == [p.var_insts for p in paras]
+
+    index = morphparser.build_index(paras)
+    assert (lindex.anchors, lindex.exact) == (index.anchors, index.exact)
+    assert lindex.msds == index.msds
+
+    model = llms["stad"][1][0]
+    assert "counts" not in model.__dict__
+    assert model.evaluate("st") == lms["stad"][1][0].evaluate("st")
+    assert model.ngramcounts == lms["stad"][1][0].ngramcounts
+    assert model.alphabet == lms["stad"][1][0].alphabet
+
+    for words in (["städer"], ["bil", "bilar"], ["män"], (["land"], [[("num", "sg")]])):
+        expected = morphparser.test_paradigms(words, paras, numexamples, lms, 1.0)
+        result = morphparser.test_paradigms(words, lparas, lnumexamples, llms, 1.0, index=lindex)
+        assert [(s, p.uuid, v) for s, p, v in result] == [(s, p.uuid, v) for s, p, v in expected]
+
+
+def test_load_model_shares_equal_slot_models(tmp_path):
+    path = str(tmp_path / "model.bin")
+    paras = _paradigms()
+    paras.append(
+        paradigm.Paradigm(
+            form_msds=[("1", [("num", "sg")]), ("1+er", [("num", "pl")])],
+            var_insts=[[("first-attest", "bil"), ("1", "bil")]],
+            uuid="bil-er",
+        )
+    )
+    paras, numexamples, lms, alphabet = morphparser.build(paras, 3, 0.01)
+    modelfile.write_model(path, paras, numexamples, lms, alphabet)
+    _, _, llms, _, _ = modelfile.load_model(path)
+    assert llms["bil"][1][0] is llms["bil-er"][1][0]
+    assert llms["bil"][1][0].alphabet is llms["stad"][1][0].alphabet
+
+
+def test_is_model_file(tmp_path):
+    path = tmp_path / "paradigms.p"
+    path.write_text("1+a+2::num=sg\t1=st,,2=d\n")
+    assert not modelfile.is_model_file(str(path))
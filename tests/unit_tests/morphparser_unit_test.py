@@ -1,3 +1,6 @@
+import math
+from typing import Any
+
 from paradigmextract import morphparser, paradigm
 
 
@@ -36,3 +39,253 @@ def test_eval_baseform_nn_1():
     variables = morphparser.eval_baseform(para, "styrelseledamot")
 
     assert variables == ["styrelseledam", "t"]
+
+
+def _noun_paradigms() -> list[paradigm.Paradigm]:
+    return [
+        paradigm.Paradigm(
+            form_msds=[
+                ("1+a+2", [("msd", "sg indef nom")]),
+                ("1+ä+2+er", [("msd", "pl indef nom")]),
+            ],
+            var_insts=[[("first-attest", "stad"), ("1", "st"), ("2", "d")]],
+            uuid="stad",
+        ),
+        paradigm.Paradigm(
+            form_msds=[("1", [("msd", "sg indef nom")]), ("1+ar", [("msd", "pl indef nom")])],
+            var_insts=[[("first-attest", "bil"), ("1", "bil")]],
+            uuid="bil",
+        ),
+        paradigm.Paradigm(
+            form_msds=[("ge+1+t", [("msd", "sup")])],
+            var_insts=[[("first-attest", "gesagt"), ("1", "sag")]],
+            uuid="gesagt",
+        ),
+        paradigm.Paradigm(
+            form_msds=[("man", [("msd", "sg indef nom")]), ("män", [("msd", "pl indef nom")])],
+            var_insts=[[("first-attest", "man")]],
+            uuid="man",
+        ),
+    ]
+
+
+def test_paradigm_index_lookup():
+    index = morphparser.build_index(_noun_paradigms()[1:])
+    assert sorted(index.lookup("bilar")) == [(0, 0), (0, 1)]
+    assert sorted(index.lookup("gesagt")) == [(0, 0), (1, 0)]
+    assert sorted(index.lookup("män")) == [(0, 0), (2, 1)]
+    # "get" is too short for "ge+1+t"
+    assert index.lookup("get") == [(0, 0)]
+    assert index.candidates(["man", "män"]) == [0, 2]
+    assert index.candidates(["bilar", "gesagt"]) == [0]
+    assert index.candidates(["gesagt", "män"]) == [0]
+
+
+def test_paradigm_index_lookup_with_tag():
+    index = morphparser.build_index(_noun_paradigms()[1:])
+    plural = [["msd", "pl indef nom"]]
+    assert sorted(index.lookup("bilar", plural)) == [(0, 1)]
+    assert index.lookup("gesagt", [("msd", "sup")]) == [(1, 0)]
+    assert index.lookup("bilar", [("msd", "sup")]) == []
+    assert index.candidates(["man", "män"], ["", plural]) == [2]
+    assert index.candidates(["man", "män"], [plural]) == []
+
+
+def test_paradigm_index_leaves_lazy_forms_uncompiled():
+    lazy = [
+        paradigm.Paradigm(
+            [("+".join(f.form), f.msd) for f in p.forms], p.var_insts, uuid=p.uuid, lazy=True
+        )
+        for p in _noun_paradigms()
+    ]
+    index = morphparser.build_index(lazy)
+    assert not any("matcher" in vars(f) or "cregex" in vars(f) for p in lazy for f in p.forms)
+    expected = morphparser.build_index(_noun_paradigms())
+    assert index.anchors == expected.anchors
+    assert index.exact == expected.exact
+    for p in _noun_paradigms():
+        for f in p.forms:
+            assert morphparser._form_literals(f.form) == f.matcher.literals
+
+
+def test_paradigm_index_agrees_with_scan():
+    paras = _noun_paradigms()
+    _, numexamples, lms, _ = morphparser.build(paras, 3, 0.01)
+    index = morphparser.build_index(paras)
+    for words in (["stad"], ["städer"], ["bil", "bilar"], ["gesagt"], ["man", "män"], ["xyz"]):
+        expected = morphparser.test_paradigms(words, paras, numexamples, lms, 1.0)
+        result = morphparser.test_paradigms(words, paras, numexamples, lms, 1.0, index=index)
+        assert result == expected
+
+
+def test_analyze_batch_agrees_with_test_paradigms():
+    paras = _noun_paradigms()
+    _, numexamples, lms, _ = morphparser.build(paras, 3, 0.01)
+    inputs = [
+        ["stad"],
+        ["bil", "bilar"],
+        ["stad"],
+        (["städer"], [[("msd", "pl indef nom")]]),
+        [],
+        ["xyz"],
+        ["bil", "bilar"],
+    ]
+    results = list(morphparser.analyze_batch(inputs, paras, numexamples, lms, 1.0, batch_size=4))
+    assert results == [
+        morphparser.test_paradigms(inp, paras, numexamples, lms, 1.0) for inp in inputs
+    ]
+    # identical inputs within a batch share their result
+    assert results[0] is results[2]
+
+
+def test_kbest_skips_paradigms_with_a_low_prior(monkeypatch):
+    paras = _noun_paradigms()
+    paras[1] = paradigm.Paradigm(
+        form_msds=[("1", [("msd", "sg indef nom")]), ("1+ar", [("msd", "pl indef nom")])],
+        var_insts=[
+            [("first-attest", w), ("1", w)] for w in ("bil", "dag", "hund", "stol", "arm")
+        ],
+        uuid="bil",
+    )
+    _, numexamples, lms, _ = morphparser.build(paras, 3, 0.01)
+    full = morphparser.test_paradigms(["bilar"], paras, numexamples, lms, 100.0)
+    assert [p.uuid for _, p, _ in full] == ["bil", "bil", "stad"]
+
+    scored = []
+    eval_multiple_entries = morphparser.eval_multiple_entries
+
+    def counting(p, *args: Any, **kwargs: Any) -> set:
+        scored.append(p.uuid)
+        return eval_multiple_entries(p, *args, **kwargs)
+
+    monkeypatch.setattr(morphparser, "eval_multiple_entries", counting)
+    top = morphparser.test_paradigms(["bilar"], paras, numexamples, lms, 100.0, kbest=1)
+    assert top == full[:1]
+    assert scored == ["bil"]
+    for kbest in (0, 2, 3, 4):
+        assert (
+            morphparser.test_paradigms(["bilar"], paras, numexamples, lms, 100.0, kbest=kbest)
+            == full[:kbest]
+        )
+
+
+def test_kbest_agrees_with_the_full_result_for_unigram_models():
+    paras = _noun_paradigms()
+    paras[1] = paradigm.Paradigm(
+        form_msds=[("1", [("msd", "sg indef nom")]), ("1+ar", [("msd", "pl indef nom")])],
+        var_insts=[
+            [("first-attest", w), ("1", w)] for w in ("bil", "dag", "hund", "stol", "arm")
+        ],
+        uuid="bil",
+    )
+    # unigram log-probabilities can be positive, so the prior is no bound
+    _, numexamples, lms, _ = morphparser.build(paras, 1, 0.01)
+    full = morphparser.test_paradigms(["städer"], paras, numexamples, lms, 1.0)
+    assert [p.uuid for _, p, _ in full] == ["stad", "bil"]
+    for kbest in range(len(full) + 1):
+        assert (
+            morphparser.test_paradigms(["städer"], paras, numexamples, lms, 1.0, kbest=kbest)
+            == full[:kbest]
+        )
+
+
+def test_eval_multiple_entries_matches_the_most_selective_word():
+    stad = _noun_paradigms()[0]
+    matched = []
+    match = stad.match
+
+    def counting(w, *args: Any, **kwargs: Any) -> list:
+        matched.append(w)
+        return match(w, *args, **kwargs)
+
+    stad.match = counting
+    assert morphparser.eval_multiple_entries(stad, ["stad", "städer"]) == {("st", "d")}
+    assert matched == ["stad"]
+    matched.clear()
+    tags = ["", [("msd", "pl indef nom")]]
+    assert morphparser.eval_multiple_entries(stad, ["stad", "städer"], tags) == {("st", "d")}
+    assert matched == ["städer"]
+    assert morphparser.eval_multiple_entries(stad, ["städer", "xyz"]) == set()
+    assert morphparser.eval_multiple_entries(stad, ["städer"], baseform=True) == set()
+    assert morphparser.eval_multiple_entries(stad, ["stad", "städer"], baseform=True) == {
+        ("st", "d")
+    }
+
+
+def test_match_cache_is_shared_between_equal_forms():
+    paras = _noun_paradigms()
+    cache = {}
+    assert paras[0].forms[0].match_vars("stad", constrained=False, cache=cache) == [
+        (1, ("st", "d"))
+    ]
+    assert list(cache) == [("(.+)a(.+)", "stad")]
+    other = paradigm.Form("1+a+2")
+    cached = cache[("(.+)a(.+)", "stad")]
+    assert other.match_vars("stad", constrained=False, cache=cache) is cached
+    # constrained matches depend on the variables of the paradigm
+    paras[0].forms[0].match_vars("stad", cache=cache)
+    assert (paras[0].forms[0], "stad") in cache
+
+
+def test_default_match_cache_is_kept_between_requests(monkeypatch):
+    monkeypatch.setattr(morphparser, "match_cache", paradigm.MatchCache(maxsize=100))
+    paras = _noun_paradigms()
+    _, numexamples, lms, _ = morphparser.build(paras, 3, 0.01)
+    first = morphparser.test_paradigms(["städer"], paras, numexamples, lms, 1.0)
+    misses = morphparser.match_cache.misses
+    assert misses > 0
+    assert morphparser.test_paradigms(["städer"], paras, numexamples, lms, 1.0) == first
+    assert morphparser.match_cache.misses == misses
+
+
+def test_string_ngram():
+    model = morphparser.StringNgram(["ab", "abb"], alphabet={"c"}, order=2, ngramprior=0.5)
+    assert model.ngramcounts == {
+        "#a": 2,
+        "ab": 2,
+        "b#": 2,
+        "bb": 1,
+        "#": 4,
+        "a": 2,
+        "b": 3,
+    }
+    assert model.evaluate_many(["ab", "ax", "c"]) == [
+        model.evaluate("ab"),
+        model.evaluate("ax"),
+        model.evaluate("c"),
+    ]
+    # The alphabet is "#abc": the denominators are count(prefix) + 4 * 0.5
+    # "#a" + "ab" + "b#"
+    assert math.isclose(
+        model.evaluate("ab"), math.log(2.5 / 6) + math.log(2.5 / 4) + math.log(2.5 / 5)
+    )
+    # "ax" and "x#" are unseen, and so is the prefix "x"
+    assert math.isclose(
+        model.evaluate("ax"), math.log(2.5 / 6) + math.log(0.5 / 4) + math.log(0.5 / 2)
+    )
+    copy = morphparser.StringNgram.from_counts(model.ngramcounts, model.alphabet, 2, 0.5)
+    assert copy.counts == model.counts
+
+
+def test_string_ngram_shares_coding_of_equal_alphabets():
+    first = morphparser.StringNgram(["ab"], alphabet={"#", "a", "b"})
+    second = morphparser.StringNgram(["ba"], alphabet={"#", "a", "b"})
+    assert isinstance(first.alphabet, frozenset)
+    assert first._codes is second._codes
+
+
+def test_build_shares_alphabet_and_equal_slot_models():
+    paras = _noun_paradigms()
+    paras.append(
+        paradigm.Paradigm(
+            form_msds=[("1", [("num", "sg")]), ("1+er", [("num", "pl")])],
+            var_insts=[[("first-attest", "bil"), ("1", "bil")]],
+            uuid="bil-er",
+        )
+    )
+    _, _, lms, alphabet = morphparser.build(paras, 2, 0.01)
+    models = [model for _, slot_models in lms.values() for model in slot_models]
+    assert lms["bil"][1][0] is lms["bil-er"][1][0]
+    assert len({id(model.alphabet) for model in models}) == 1
+    assert alphabet <= models[0].alphabet
+    assert morphparser.lms_size(lms) > 0
@@ -0,0 +1,167 @@
+import asyncio
+import contextlib
+import socket
+import threading
+from typing import Any
+
+import pytest
+
+from paradigmextract import morphparser, morphserver, paradigm
+
+
+def _model(**options: Any) -> morphserver.Model:
+    paras = [
+        paradigm.Paradigm(
+            form_msds=[
+                ("1+a+2", [("num", "sg")]),
+                ("1+ä+2+er", [("num", "pl")]),
+            ],
+            var_insts=[[("first-attest", "stad"), ("1", "st"), ("2", "d")]],
+            uuid="stad",
+        ),
+        paradigm.Paradigm(
+            form_msds=[("1", [("num", "sg")]), ("1+ar", [("num", "pl")])],
+            var_insts=[[("first-attest", "bil"), ("1", "bil")]],
+            uuid="bil",
+        ),
+    ]
+    paras, numexamples, lms, _ = morphparser.build(paras, 3, 0.01)
+    return morphserver.Model(paras, numexamples, lms, **options)
+
+
+LINES = ["städer\n", "bil bilar\n", "xyz\n", "stad\n"] * 5
+
+
+def test_format_analyses():
+    model = _model(print_tables=True)
+    [result] = model.analyze_lines(["bil bilar"])
+    score, rest = result.split(" ", 1)
+    float(score)
+    assert rest == (
+        "p_bil (1=bil) bil:bil,num=sg#bilar:bil,num=pl\n"
+        "*bil*\tnum=sg\n"
+        "*bilar*\tnum=pl\n"
+        "\n"
+    )
+    assert model.analyze_lines(["", "\n"]) == ["\n", "\n"]
+
+
+def test_pool_keeps_order():
+    model = _model(kbest=2)
+    expected = model.analyze_lines(LINES)
+    with morphserver.AnalysisPool(model, workers=1, batch_size=3) as pool:
+        assert list(pool.analyze(LINES)) == expected
+    with morphserver.AnalysisPool(model, workers=2, batch_size=3) as pool:
+        assert list(pool.analyze(LINES)) == expected
+        assert list(pool.analyze(iter(LINES[:2]))) == expected[:2]
+
+
+def test_unix_socket_server(tmp_path):
+    model = _model()
+    path = str(tmp_path / "morph.sock")
+    pool = morphserver.AnalysisPool(model, workers=1, batch_size=2)
+    with morphserver.UnixSocketServer(path, pool) as server:
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            with socket.socket(socket.AF_UNIX) as client:
+                client.connect(path)
+                client.sendall("".join(LINES).encode("utf-8"))
+                client.shutdown(socket.SHUT_WR)
+                response = client.makefile(encoding="utf-8").read()
+        finally:
+            server.shutdown()
+            thread.join()
+    assert response == "".join(model.analyze_lines(LINES))
+
+
+def test_unix_socket_server_partial_batch(tmp_path):
+    model = _model()
+    path = str(tmp_path / "morph.sock")
+    pool = morphserver.AnalysisPool(model, workers=1, batch_size=64)
+    with morphserver.UnixSocketServer(path, pool) as server:
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            with socket.socket(socket.AF_UNIX) as client:
+                # Without shutdown(SHUT_WR), each line is answered on its own
+                client.settimeout(10)
+                client.connect(path)
+                reader = client.makefile(encoding="utf-8")
+                responses = []
+                for line in LINES[:2]:
+                    client.sendall(line.encode("utf-8"))
+                    responses.append(_read_analyses(reader))
+        finally:
+            server.shutdown()
+            thread.join()
+    assert responses == model.analyze_lines(LINES[:2])
+
+
+def _read_analyses(reader) -> str:
+    response = ""
+    while not response.endswith("\n\n"):
+        response += reader.readline()
+    return response
+
+
+def test_async_analyzer():
+    model = _model()
+    requests = [["städer"], ["bil", "bilar"], ["xyz"], ["stad"]] * 10
+    requests.append((["städer"], [[("num", "pl")]]))
+
+    async def run() -> list:
+        async with morphserver.AsyncAnalyzer(model, workers=2, max_batch=8) as analyzer:
+            return await asyncio.gather(
+                *(
+                    analyzer.analyze(*(request if isinstance(request, tuple) else (request,)))
+                    for request in requests
+                )
+            )
+
+    expected = [
+        morphparser.test_paradigms(request, model.paradigms, model.numexamples, model.lms, 1.0)
+        for request in requests
+    ]
+    assert asyncio.run(run()) == [[(s, p, tuple(v)) for s, p, v in r] for r in expected]
+
+
+def test_async_analyzer_fails_requests_when_pool_breaks():
+    model = _model()
+
+    async def run() -> list:
+        async with morphserver.AsyncAnalyzer(model, workers=1, max_batch=2) as analyzer:
+            # Scheduling work on the executor now raises, like a broken pool
+            analyzer._executor.shutdown()
+            results = await asyncio.wait_for(
+                asyncio.gather(
+                    *(analyzer.analyze(["stad"]) for _ in range(5)), return_exceptions=True
+                ),
+                timeout=10,
+            )
+            with pytest.raises(RuntimeError):
+                await analyzer.analyze(["stad"])
+            return results
+
+    results = asyncio.run(run())
+    assert len(results) == 5
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_async_analyzers_keep_their_models():
+    model = _model()
+    reversed_model = morphserver.Model(
+        model.paradigms[::-1], model.numexamples, model.lms, index=model.index
+    )
+
+    async def run() -> tuple:
+        async with contextlib.AsyncExitStack() as stack:
+            first = await stack.enter_async_context(morphserver.AsyncAnalyzer(model, workers=1))
+            second = await stack.enter_async_context(
+                morphserver.AsyncAnalyzer(reversed_model, workers=1)
+            )
+            return await first.analyze(["bilar"]), await second.analyze(["bilar"])
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert first[0][1].uuid == "bil"
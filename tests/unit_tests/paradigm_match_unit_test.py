@@ -1,5 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
+from paradigmextract import paradigm
 from paradigmextract.paradigm import Paradigm
 
 
@@ -35,6 +38,48 @@ def test_2():
     ]
 
 
+def test_tagged_forms():
+    form_msds = [
+        ("1+a+2", [("num", "sg"), ("case", "nom")]),
+        ("1+ä+2+er", [("num", "pl"), ("case", "nom")]),
+        ("1+a+2+s", [("num", "sg"), ("case", "gen")]),
+    ]
+    p = Paradigm(form_msds, [[("1", "b"), ("2", "d")]])
+    assert p.msd_forms[(("num", "pl"), ("case", "nom"))] == [1]
+    assert p.tagged_forms([["num", "pl"], ["case", "nom"]]) == [p.forms[1]]
+    assert p.tagged_forms([("num", "sg"), ("case", "nom")], baseform=True) == [p.forms[0]]
+    assert p.tagged_forms([("num", "sg"), ("case", "gen")], baseform=True) == []
+    assert p.match("städer", constrained=False, tag=(("num", "pl"), ("case", "nom"))) == [
+        [(3, ("st", "d"))]
+    ]
+    assert paradigm.msd_key([["num", "pl"]]) == (("num", "pl"),)
+
+
+def test_match_table():
+    form_msds = [
+        ("1+a+2", ("msd", "sg indef nom")),
+        ("1+ä+2+er", ("msd", "pl indef nom")),
+        ("1+a+2+s", ("msd", "sg indef gen")),
+    ]
+    var_insts = [[("1", "b"), ("2", "d")]]
+    p = Paradigm(form_msds, var_insts)
+    assert p.match_table(["banana"]) == {("b", "nana"), ("ban", "na")}
+    assert p.match_table(["stad", "städer"]) == {("st", "d")}
+    assert p.match_table(["banana", "bananäer"]) == set()
+    assert p.match_table(["stads"], tags=[("msd", "sg indef gen")]) == {("st", "d")}
+    assert p.match_table(["stads"], baseform=True) == {("st", "ds")}
+
+
+def test_match_table_binds_variables_across_forms():
+    # the second variable does not occur in the first form
+    form_msds = [("1", ("msd", "inf")), ("1+e+2", ("msd", "pres")), ("ge+1+2", ("msd", "sup"))]
+    p = Paradigm(form_msds, [[("1", "sag"), ("2", "n")]])
+    assert p.match_table(["sagen"]) == {("sag", "n"), ("sagen", None)}
+    assert p.match_table(["sag", "sagen"]) == {("sag", "n")}
+    assert p.match_table(["sag", "gesagt"]) == {("sag", "t")}
+    assert p.match_table(["gesagt", "sagen"], baseform=True) == set()
+
+
 @pytest.mark.xfail(reason="don't know")
 def test_paradigm_match_vars():
     form_msds = [
@@ -45,3 +90,70 @@ def test_paradigm_match_vars():
     var_insts = [[("1", "b"), ("2", "d")]]
     p = Paradigm(form_msds, var_insts)
     _match_vars = p.match_vars
+
+
+def test_match_is_silent_and_traced(capsys):
+    form_msds = [
+        ("1+a+2", ("msd", "sg indef nom")),
+        ("1+ä+2+er", ("msd", "pl indef nom")),
+    ]
+    p = Paradigm(form_msds, [[("1", "b"), ("2", "d")]])
+    events = []
+    paradigm.set_trace_hook(lambda event, fields: events.append((event, fields)))
+    try:
+        assert p.match("stad", constrained=False) == [[(1, ("st", "d"))], None]
+    finally:
+        paradigm.set_trace_hook(None)
+    assert not capsys.readouterr().out
+    assert [event for event, _ in events] == [
+        "paradigm.match",
+        "form.match_vars",
+        "paradigm.match.form",
+        "form.match_vars",
+        "paradigm.match.form",
+    ]
+    assert events[2][1]["matches"] == [(1, ("st", "d"))]
+
+    events.clear()
+    p.match("stad", constrained=False)
+    assert events == []
+
+
+def test_match_cache_evicts_least_recently_used():
+    cache = paradigm.MatchCache(maxsize=2)
+    form = paradigm.Form("1+a+2")
+    form.match_vars("stad", constrained=False, cache=cache)
+    form.match_vars("bad", constrained=False, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert form.match_vars("stad", constrained=False, cache=cache) == [(1, ("st", "d"))]
+    assert (cache.hits, cache.misses) == (1, 2)
+    form.match_vars("glas", constrained=False, cache=cache)
+    assert list(cache) == [("(.+)a(.+)", "stad"), ("(.+)a(.+)", "glas")]
+    assert repr(cache) == "MatchCache(maxsize=2, size=2, hits=1, misses=3)"
+    cache.clear()
+    assert (len(cache), cache.hits, cache.misses) == (0, 0, 0)
+
+
+def test_match_cache_contains_is_not_a_lookup():
+    cache = paradigm.MatchCache(maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert "a" in cache
+    assert "c" not in cache
+    assert (cache.hits, cache.misses) == (0, 0)
+    cache["c"] = 3
+    assert list(cache) == ["b", "c"]
+
+
+def test_match_cache_threads():
+    cache = paradigm.MatchCache(maxsize=100)
+
+    def fill(start: int) -> None:
+        for i in range(start, start + 1000):
+            cache[i % 150] = i
+            cache.get(i % 170)
+
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(fill, range(0, 4000, 1000)))
+    assert len(cache) == 100
+    assert cache.hits + cache.misses == 4000
@@ -0,0 +1,62 @@
+import gzip
+
+import pytest
+
+from paradigmextract import paradigm
+
+P_FILE = (
+    "1+a+2::num=sg,,case=nom#1+ä+2+er::num=pl,,case=nom"
+    "\tfirst-attest=stad,,1=st,,2=d#first-attest=bad,,1=b,,2=d\n"
+    "man::SGNOM#män::PLNOM\t\n"
+    "1::num=sg,,case=nom#1+ar::num=pl,,case=nom"
+    "\tfirst-attest=bil,,1=bil#first-attest=hund,,1=hund#first-attest=stol,,1=stol\n"
+)
+
+
+def test_iter_p_file(tmp_path):
+    path = tmp_path / "nouns.p"
+    path.write_text(P_FILE, encoding="utf-8")
+    paradigms = list(paradigm.iter_p_file(str(path), pos="nn", lazy=True))
+    assert [p.uuid for p in paradigms] == ["p1_stad", "p2", "p3_bil"]
+    stad, man, bil = paradigms
+    assert stad.pos == "nn"
+    assert stad.forms[1].msd == [("num", "pl"), ("case", "nom")]
+    assert stad.var_insts[1] == [("first-attest", "bad"), ("1", "b"), ("2", "d")]
+    assert man.forms[0].msd == [(None, "SGNOM")]
+    assert man.var_insts == []
+    # equal msds and variable names are shared
+    assert bil.forms[1].msd is stad.forms[1].msd
+    assert bil.var_insts[0][1][0] is stad.var_insts[0][1][0]
+    assert stad("st", "d") == [("stad", stad.forms[0].msd), ("städer", stad.forms[1].msd)]
+    assert [str(p) for p in paradigms] == P_FILE.splitlines()
+
+
+def test_load_p_file_sorts_by_members(tmp_path):
+    path = tmp_path / "nouns.p"
+    path.write_text(P_FILE, encoding="utf-8")
+    paradigms = paradigm.load_p_file(str(path))
+    assert [(p.p_id, p.uuid, p.count) for p in paradigms] == [
+        ("p1_bil", "p1_bil", 3),
+        ("p2_stad", "p2_stad", 2),
+        ("p3", "p3", 0),
+    ]
+
+
+def test_write_p_file_round_trip(tmp_path):
+    path = tmp_path / "nouns.p"
+    path.write_text(P_FILE, encoding="utf-8")
+    paradigms = list(paradigm.iter_p_file(str(path)))
+    gzipped = str(tmp_path / "nouns.p.gz")
+    paradigm.write_p_file(gzipped, paradigms)
+    with gzip.open(gzipped, "rt", encoding="utf-8") as fp:
+        assert fp.read() == P_FILE
+    assert [str(p) for p in paradigm.iter_p_file(gzipped)] == [str(p) for p in paradigms]
+
+
+def test_iter_p_file_reports_the_line(tmp_path):
+    path = tmp_path / "broken.p"
+    path.write_text("1+a::num=sg\t1=b\n1+a::num=sg\t1b\n", encoding="utf-8")
+    paradigms = paradigm.iter_p_file(str(path))
+    assert next(paradigms).uuid == "p1_b"
+    with pytest.raises(ValueError, match="line 2"):
+        next(paradigms)
@@ -0,0 +1,51 @@
+from paradigmextract.paradigm import Form, Paradigm, variable_regexes
+
+
+def test_forms_share_variable_regexes():
+    form_msds = [
+        ("1+a+2", ("msd", "sg indef nom")),
+        ("1+ä+2+er", ("msd", "pl indef nom")),
+        ("1+a+2+s", ("msd", "sg indef gen")),
+    ]
+    var_insts = [[("1", "b"), ("2", "d")], [("1", "st"), ("2", "d")]]
+    p = Paradigm(form_msds, var_insts)
+    assert all(f.v_regex is p.v_regex for f in p.forms)
+    assert [r.pattern for r in p.v_regex] == [r.pattern for r in variable_regexes(var_insts)]
+
+
+def test_variable_regexes_are_cached():
+    var_insts = [[("1", "b"), ("2", "d")], [("1", "st"), ("2", "d")]]
+    other_insts = [[("1", "st"), ("2", "d")], [("1", "b"), ("2", "d")]]
+    assert all(
+        r1 is r2 for r1, r2 in zip(variable_regexes(var_insts), variable_regexes(other_insts))
+    )
+
+
+def test_form_without_paradigm():
+    form = Form("1+s", v_insts=[[("1", "bil")], [("1", "bok")]])
+    assert form.match_vars("bils", constrained=False) == [(1, ("bil",))]
+
+
+def test_lazy_paradigm_matches_like_eager():
+    form_msds = [
+        ("1+a+2", ("msd", "sg indef nom")),
+        ("1+ä+2+er", ("msd", "pl indef nom")),
+        ("1+a+2+s", ("msd", "sg indef gen")),
+    ]
+    var_insts = [[("1", "b"), ("2", "d")], [("1", "st"), ("2", "d")]]
+    eager = Paradigm(form_msds, var_insts)
+    lazy = Paradigm(form_msds, var_insts, lazy=True)
+    assert "cregex" not in vars(lazy.forms[0])
+    assert "v_regex" not in vars(lazy)
+
+    for w in ("stad", "städer", "bads", "apa"):
+        assert lazy.match(w, constrained=False) == eager.match(w, constrained=False)
+        assert lazy.match(w) == eager.match(w)
+    assert [r.pattern for r in lazy.v_regex] == [r.pattern for r in eager.v_regex]
+    assert lazy.forms[1].scount == 3
+    assert all(f.v_regex is lazy.v_regex for f in lazy.forms)
+
+
+def test_lazy_form_unknown_attribute():
+    form = Form("1+s", lazy=True)
+    assert not hasattr(form, "nothing")